@@ -0,0 +1,77 @@
+# Caching of each user's address book, for the checkout pages.
+#
+# Like the cached users in backends.py, addresses are stored under a per-user
+# version number that is bumped whenever one of the user's addresses is saved
+# or deleted. So the cache must be shared by all processes (e.g. Redis or
+# memcached, not LocMemCache), or other processes keep showing old addresses
+# until TIMEOUT.
+#
+# Off unless the USER_ADDRESS_CACHE setting names a cache, e.g.
+#
+#   USER_ADDRESS_CACHE = 'default'
+
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Address
+
+TIMEOUT = 60 * 60
+
+
+def get_user_addresses(user):
+    if settings.USER_ADDRESS_CACHE is None:
+        return list(user.addresses.order_by('primary', 'first_line'))
+    cache = caches[settings.USER_ADDRESS_CACHE]
+    key = f'user-addresses:{user.pk}:{_version(cache, user.pk)}'
+    addresses = cache.get(key)
+    if addresses is None:
+        addresses = list(user.addresses.order_by('primary', 'first_line'))
+        cache.set(key, addresses, TIMEOUT)
+    return addresses
+
+
+def _version(cache, user_id):
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        cache.add(key, version, None)
+        version = cache.get(key, version)
+    return version
+
+
+def _version_key(user_id):
+    return f'user-addresses:{user_id}:version'
+
+
+def invalidate_user_addresses(user_id):
+    if settings.USER_ADDRESS_CACHE is None:
+        return
+    try:
+        caches[settings.USER_ADDRESS_CACHE].incr(_version_key(user_id))
+    except ValueError:
+        pass  # Nothing cached for this user.
+
+
+@receiver(pre_save, sender=Address)
+def remember_old_user(sender, instance, **kwargs):
+    # In case the address is moved to a different user.
+    if settings.USER_ADDRESS_CACHE is not None and instance.pk is not None:
+        instance._old_user_id = sender.objects.filter(pk=instance.pk).values_list('user_id', flat=True).first()
+
+
+@receiver(post_save, sender=Address)
+@receiver(post_delete, sender=Address)
+def invalidate_addresses(sender, instance, **kwargs):
+    user_ids = {instance.user_id, getattr(instance, '_old_user_id', None)} - {None}
+
+    def invalidate():
+        for user_id in user_ids:
+            invalidate_user_addresses(user_id)
+
+    transaction.on_commit(invalidate)
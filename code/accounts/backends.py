@@ -0,0 +1,103 @@
+# An authentication backend that caches users, to save a query on every
+# request.
+#
+# `AuthenticationMiddleware` loads `request.user` from the database the first
+# time anything looks at it, which for pages behind `premium_required` and
+# friends is every request. This backend keeps what those checks need in the
+# cache instead: `is_active`, `is_premium`, `good_reputation`, and the hash
+# that `login()` puts in the session - not the password hash itself. The user
+# it returns has its other fields deferred, so they're loaded from the
+# database if anything uses them.
+#
+# Each user has a version number in the cache, which is part of the key the
+# user is stored under. Saving or deleting a user bumps the version (once the
+# transaction commits), so the next request loads the user afresh - e.g.
+# revoking premium status takes effect straight away. Changes that don't
+# send signals (`QuerySet.update()`, raw SQL) are only picked up when the
+# cached user expires, after USER_CACHE_TIMEOUT seconds.
+#
+# The cache must be shared by all processes (e.g. Redis or memcached, not
+# LocMemCache), or other processes won't see the version change.
+#
+# Enable with:
+#
+#   AUTHENTICATION_BACKENDS = ['accounts.backends.CachedModelBackend']
+
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.db import router, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        user = get_cached_user(user_id)
+        if user is None:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+
+CACHED_FIELDS = ['id', 'is_active', 'is_premium', 'good_reputation']
+
+
+def get_cached_user(user_id):
+    UserModel = get_user_model()
+    cache = _cache()
+    key = f'user:{user_id}:{user_version(user_id)}'
+    cached = cache.get(key)
+    if cached is None:
+        try:
+            user = UserModel._default_manager.get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        cached = {name: getattr(user, name) for name in CACHED_FIELDS}
+        cached['session_auth_hash'] = user.get_session_auth_hash()
+        cache.set(key, cached, settings.USER_CACHE_TIMEOUT)
+
+    user = UserModel.from_db(router.db_for_read(UserModel), CACHED_FIELDS,
+                             [cached[name] for name in CACHED_FIELDS])
+    # Otherwise it would load the (deferred) password to work this out.
+    session_auth_hash = cached['session_auth_hash']
+    user.get_session_auth_hash = lambda: session_auth_hash
+    return user
+
+
+def user_version(user_id):
+    cache = _cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Start from a value that can't collide with keys left over from a
+        # version that was evicted.
+        version = time.time_ns()
+        cache.add(key, version, None)
+        version = cache.get(key, version)
+    return version
+
+
+def invalidate_user(user_id):
+    try:
+        _cache().incr(_version_key(user_id))
+    except ValueError:
+        pass  # Nothing cached for this user.
+
+
+def _version_key(user_id):
+    return f'user:{user_id}:version'
+
+
+def _cache():
+    return caches[settings.USER_CACHE_ALIAS]
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # After commit, so that no-one can cache the old row under the new version.
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_user(user_id))
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-17 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_user_good_reputation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='address',
+            index=models.Index(fields=['user', 'primary', 'first_line'], name='accounts_address_user_idx'),
+        ),
+    ]
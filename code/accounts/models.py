@@ -15,5 +15,11 @@ class Address(models.Model):
     primary = models.BooleanField(default=False)
     short_name = models.CharField(max_length=50)
 
+    class Meta:
+        indexes = [
+            # For user.addresses.order_by('primary', 'first_line')
+            models.Index(fields=['user', 'primary', 'first_line'], name='accounts_address_user_idx'),
+        ]
+
     def __str__(self):
         return self.short_name
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class ShopConfig(AppConfig):
+    name = 'shop'
+
+    def ready(self):
+        # Connect signal handlers
+        from . import object_cache  # noqa: F401
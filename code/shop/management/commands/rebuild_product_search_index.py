@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from shop.search_index import rebuild_search_index, search_index_available
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full text search index for products from the shop tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, database, **options):
+        if not search_index_available(database):
+            raise CommandError("The product search index needs SQLite, and the shop migrations to be applied.")
+        count, duration = rebuild_search_index(database)
+        self.stdout.write(f'Indexed {count:,} products in {duration:.2f}s')
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from shop.seeding import CATALOG_MODELS, seed_catalog
+
+
+class Command(BaseCommand):
+    help = ("Fills the shop tables with a generated catalog, for benchmarking. "
+            "The same arguments always generate the same catalog.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1_000_000)
+        parser.add_argument('--colors', type=int, default=1000)
+        parser.add_argument('--special-offers', type=int, default=1000)
+        parser.add_argument('--products-per-offer', type=int, default=1000)
+        parser.add_argument('--description-words', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--clear', action='store_true', help="Delete the existing catalog first")
+
+    def handle(self, *args, products, colors, special_offers, products_per_offer, description_words, seed,
+               batch_size, database, clear, **options):
+        # With --clear, the old catalog is deleted in the same transaction as
+        # the new one is added, so it's still there if seeding fails.
+        if not clear and any(model.objects.using(database).exists() for model in CATALOG_MODELS):
+            # Otherwise the IDs, and so the catalog, would depend on what was there before.
+            raise CommandError('The catalog is not empty. Use --clear to replace it.')
+
+        self.stdout.write(f'{"table":<28} {"rows":>12} {"seconds":>8} {"rows/sec":>10}')
+        total_rows = 0
+        total_seconds = 0
+
+        def progress(table, rows, seconds):
+            nonlocal total_rows, total_seconds
+            total_rows += rows
+            total_seconds += seconds
+            rate = rows / seconds if seconds else 0
+            self.stdout.write(f'{table:<28} {rows:>12,} {seconds:>8.2f} {rate:>10,.0f}')
+
+        seed_catalog(
+            products=products, colors=colors, special_offers=special_offers,
+            products_per_offer=products_per_offer, seed=seed, description_words=description_words,
+            batch_size=batch_size, using=database, progress=progress, clear=clear,
+        )
+        self.stdout.write(f'{"total":<28} {total_rows:>12,} {total_seconds:>8.2f} '
+                          f'{total_rows / total_seconds if total_seconds else 0:>10,.0f}')
@@ -0,0 +1,99 @@
+from django.db import migrations
+
+# Full text search index for products, using SQLite's FTS5 extension. It is
+# kept up to date by triggers, so it works with bulk inserts and raw SQL too.
+# The index can be rebuilt with `manage.py rebuild_product_search_index`.
+# shop/search_index.py has the current version of this SQL - this copy must
+# stay as it was when the migration was written.
+# See also the_right_way/dependency_injection/fts_search.py
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE shop_product_fts USING fts5(
+        name, description, colors,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER shop_product_fts_insert AFTER INSERT ON shop_product BEGIN
+        INSERT INTO shop_product_fts(rowid, name, description, colors)
+        VALUES (new.id, new.name, new.description, '');
+    END
+    """,
+    """
+    CREATE TRIGGER shop_product_fts_update AFTER UPDATE OF name, description ON shop_product BEGIN
+        UPDATE shop_product_fts SET name = new.name, description = new.description
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER shop_product_fts_delete AFTER DELETE ON shop_product BEGIN
+        DELETE FROM shop_product_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER shop_product_colors_fts_insert AFTER INSERT ON shop_product_colors BEGIN
+        UPDATE shop_product_fts SET colors = coalesce(
+            (SELECT group_concat(c.name, ' ')
+             FROM shop_product_colors pc JOIN shop_color c ON c.id = pc.color_id
+             WHERE pc.product_id = new.product_id), '')
+        WHERE rowid = new.product_id;
+    END
+    """,
+    """
+    CREATE TRIGGER shop_product_colors_fts_delete AFTER DELETE ON shop_product_colors BEGIN
+        UPDATE shop_product_fts SET colors = coalesce(
+            (SELECT group_concat(c.name, ' ')
+             FROM shop_product_colors pc JOIN shop_color c ON c.id = pc.color_id
+             WHERE pc.product_id = old.product_id), '')
+        WHERE rowid = old.product_id;
+    END
+    """,
+    """
+    CREATE TRIGGER shop_color_fts_update AFTER UPDATE OF name ON shop_color BEGIN
+        UPDATE shop_product_fts SET colors = coalesce(
+            (SELECT group_concat(c.name, ' ')
+             FROM shop_product_colors pc JOIN shop_color c ON c.id = pc.color_id
+             WHERE pc.product_id = shop_product_fts.rowid), '')
+        WHERE rowid IN (SELECT product_id FROM shop_product_colors WHERE color_id = new.id);
+    END
+    """,
+    """
+    INSERT INTO shop_product_fts(rowid, name, description, colors)
+    SELECT p.id, p.name, p.description, coalesce(
+        (SELECT group_concat(c.name, ' ')
+         FROM shop_product_colors pc JOIN shop_color c ON c.id = pc.color_id
+         WHERE pc.product_id = p.id), '')
+    FROM shop_product p
+    """,
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS shop_color_fts_update",
+    "DROP TRIGGER IF EXISTS shop_product_colors_fts_delete",
+    "DROP TRIGGER IF EXISTS shop_product_colors_fts_insert",
+    "DROP TRIGGER IF EXISTS shop_product_fts_delete",
+    "DROP TRIGGER IF EXISTS shop_product_fts_update",
+    "DROP TRIGGER IF EXISTS shop_product_fts_insert",
+    "DROP TABLE IF EXISTS shop_product_fts",
+]
+
+
+def run_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0006_product_name_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sqlite(CREATE_SQL), run_sqlite(DROP_SQL)),
+    ]
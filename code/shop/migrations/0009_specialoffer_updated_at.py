@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-17 21:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0008_product_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='specialoffer',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
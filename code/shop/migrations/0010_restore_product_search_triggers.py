@@ -0,0 +1,56 @@
+from django.db import migrations
+
+# 0008 added a field to Product, and on SQLite that rebuilds shop_product,
+# which dropped its search index triggers (see 0007). This puts them back, and
+# refills the index, which has missed any changes to products since. The SQL
+# is as it was then - see shop/search_index.py for the current version.
+
+PRODUCT_TRIGGERS = {
+    'shop_product_fts_insert': """
+    CREATE TRIGGER shop_product_fts_insert AFTER INSERT ON shop_product BEGIN
+        INSERT INTO shop_product_fts(rowid, name, description, colors)
+        VALUES (new.id, new.name, new.description, '');
+    END
+    """,
+    'shop_product_fts_update': """
+    CREATE TRIGGER shop_product_fts_update AFTER UPDATE OF name, description ON shop_product BEGIN
+        UPDATE shop_product_fts SET name = new.name, description = new.description
+        WHERE rowid = new.id;
+    END
+    """,
+    'shop_product_fts_delete': """
+    CREATE TRIGGER shop_product_fts_delete AFTER DELETE ON shop_product BEGIN
+        DELETE FROM shop_product_fts WHERE rowid = old.id;
+    END
+    """,
+}
+
+FILL_SQL = """
+    INSERT INTO shop_product_fts(rowid, name, description, colors)
+    SELECT p.id, p.name, p.description, coalesce(
+        (SELECT group_concat(c.name, ' ')
+         FROM shop_product_colors pc JOIN shop_color c ON c.id = pc.color_id
+         WHERE pc.product_id = p.id), '')
+    FROM shop_product p
+"""
+
+
+def restore_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name, sql in PRODUCT_TRIGGERS.items():
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        schema_editor.execute(sql)
+    schema_editor.execute('DELETE FROM shop_product_fts')
+    schema_editor.execute(FILL_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0009_specialoffer_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(restore_triggers, migrations.RunPython.noop),
+    ]
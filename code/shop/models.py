@@ -7,6 +7,15 @@ class Product(models.Model):
     slug = models.SlugField(unique=True)
     description = models.TextField()
     colors = models.ManyToManyField('Color')
+    # Used as a version stamp for caching. Note that QuerySet.update() doesn't
+    # change it, unless you do so explicitly.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Supports keyset pagination, which orders on (name, id)
+            models.Index(fields=['name', 'id'], name='shop_product_name_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -25,6 +34,8 @@ class SpecialOffer(models.Model):
     slug = models.SlugField(unique=True)
     description = models.TextField()
     products = models.ManyToManyField(Product, related_name='special_offers')
+    # Also changed when products are added or removed - see object_cache.py
+    updated_at = models.DateTimeField(auto_now=True)
 
     def get_products(self):
         return self.products.all().order_by('name')
@@ -0,0 +1,136 @@
+# Caching of products and special offers by slug, and HTTP validators (ETag
+# and Last-Modified) for pages showing them.
+#
+# With validators, a client that already has the current version of a page
+# gets a '304 Not Modified' instead. For product detail pages, the product
+# comes from the cache, so a 304 costs no queries and no template rendering.
+# Special offer pages also depend on which products are in the offer, and
+# what they are called, so they need one (aggregate) query.
+#
+# Use with `django.views.decorators.http.condition`, e.g.
+#
+#   @condition(etag_func=product_etag, last_modified_func=product_last_modified)
+#   def product_detail(request, slug):
+#
+# Entries are invalidated by signal handlers, in the process that saves or
+# deletes the object. With a cache that each process has its own copy of, like
+# the LocMemCache in our settings, other processes keep serving (and
+# validating ETags against) the old object for up to TIMEOUT. Run more than
+# one process only with a shared cache, e.g. Memcached or Redis.
+
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.http import Http404
+from django.utils import timezone
+
+from .models import Product, SpecialOffer
+
+TIMEOUT = 60 * 60
+
+
+def get_cached_or_404(model, slug):
+    # Only as fresh as the cache - see the note on invalidation above.
+    key = _cache_key(model, slug)
+    obj = cache.get(key)
+    if obj is None:
+        try:
+            obj = model.objects.get(slug=slug)
+        except model.DoesNotExist:
+            raise Http404(f'No {model._meta.verbose_name} found matching the query')
+        cache.set(key, obj, TIMEOUT)
+    return obj
+
+
+def _cache_key(model, slug):
+    return f'{model._meta.label_lower}:slug:{slug}'
+
+
+# Validators
+
+def product_etag(request, slug, **kwargs):
+    product = _get_or_none(Product, slug)
+    if product is None:
+        return None
+    return f'"product-{product.pk}-{product.updated_at.timestamp()}"'
+
+
+def product_last_modified(request, slug, **kwargs):
+    product = _get_or_none(Product, slug)
+    return None if product is None else product.updated_at
+
+
+def special_offer_etag(request, slug, **kwargs):
+    validators = _special_offer_validators(request, slug)
+    return None if validators is None else validators[0]
+
+
+def special_offer_last_modified(request, slug, **kwargs):
+    validators = _special_offer_validators(request, slug)
+    return None if validators is None else validators[1]
+
+
+def _special_offer_validators(request, slug):
+    # Computed once per request, for both ETag and Last-Modified.
+    if not hasattr(request, '_special_offer_validators'):
+        special_offer = _get_or_none(SpecialOffer, slug)
+        if special_offer is None:
+            validators = None
+        else:
+            # Adding or removing products changes special_offer.updated_at,
+            # editing or deleting them changes the max or count.
+            products = special_offer.products.aggregate(last_updated=Max('updated_at'), count=Count('id'))
+            stamp = repr((special_offer.pk, special_offer.updated_at, products['last_updated'], products['count']))
+            validators = (
+                f'"special-offer-{hashlib.md5(stamp.encode("utf-8")).hexdigest()}"',
+                max(filter(None, [special_offer.updated_at, products['last_updated']])),
+            )
+        request._special_offer_validators = validators
+    return request._special_offer_validators
+
+
+def _get_or_none(model, slug):
+    try:
+        return get_cached_or_404(model, slug)
+    except Http404:
+        return None
+
+
+# Invalidation
+
+@receiver(pre_save, sender=Product)
+@receiver(pre_save, sender=SpecialOffer)
+def remember_old_slug(sender, instance, **kwargs):
+    if instance.pk is not None:
+        instance._old_slug = sender.objects.filter(pk=instance.pk).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=SpecialOffer)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=SpecialOffer)
+def uncache_object(sender, instance, **kwargs):
+    cache.delete_many([_cache_key(sender, slug) for slug in {instance.slug, getattr(instance, '_old_slug', None)}
+                       if slug is not None])
+
+
+@receiver(m2m_changed, sender=SpecialOffer.products.through)
+def special_offer_products_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # After the clear we won't be able to tell which offers it was in.
+        instance._cleared_special_offer_ids = list(instance.special_offers.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        offer_ids = [instance.pk]
+    elif action == 'post_clear':
+        offer_ids = getattr(instance, '_cleared_special_offer_ids', [])
+    else:
+        offer_ids = pk_set
+    offers = SpecialOffer.objects.filter(pk__in=offer_ids)
+    offers.update(updated_at=timezone.now())
+    cache.delete_many([_cache_key(SpecialOffer, slug) for slug in offers.values_list('slug', flat=True)])
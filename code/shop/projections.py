@@ -0,0 +1,84 @@
+# Projections - ways of loading only the columns a page actually needs.
+#
+# A projection is a function that takes a Product QuerySet and returns
+# something that can be counted, sliced and iterated in the same way, but
+# which doesn't load everything. In particular, list pages never need
+# `description`, which can be arbitrarily long.
+#
+# Whichever projection you use, the result must include `id`.
+
+LIST_FIELDS = ('id', 'name', 'slug', 'updated_at')
+
+
+def only(*fields):
+    # Model instances, with other fields deferred (and loaded with an extra
+    # query each if you do access them).
+    def projection(queryset):
+        return queryset.only(*fields)
+    projection.__qualname__ = f'only{fields}'
+    return projection
+
+
+def values(*fields):
+    # Dictionaries instead of model instances.
+    def projection(queryset):
+        return queryset.values(*fields)
+    projection.__qualname__ = f'values{fields}'
+    return projection
+
+
+class ProductListRow:
+    # Much lighter than a model instance, but with the attributes templates use.
+    __slots__ = LIST_FIELDS
+
+    def __init__(self, id, name, slug, updated_at):
+        self.id = id
+        self.name = name
+        self.slug = slug
+        self.updated_at = updated_at
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f'<ProductListRow: {self.name}>'
+
+
+class RowQuerySet:
+    def __init__(self, queryset, row_class):
+        self.queryset = queryset.values_list(*row_class.__slots__)
+        self.row_class = row_class
+
+    # Enough of the QuerySet API for Paginator and our count caching.
+    query = property(lambda self: self.queryset.query)
+    db = property(lambda self: self.queryset.db)
+    model = property(lambda self: self.queryset.model)
+    ordered = property(lambda self: self.queryset.ordered)
+
+    def count(self):
+        return self.queryset.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        row_class = self.row_class
+        return (row_class(*values) for values in self.queryset)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.row_class(*values) for values in self.queryset[index]]
+        return self.row_class(*self.queryset[index])
+
+
+def product_list_rows(queryset):
+    return RowQuerySet(queryset, ProductListRow)
+
+
+def object_id(obj):
+    # Works for the output of any of the projections above.
+    return obj['id'] if isinstance(obj, dict) else obj.pk
@@ -0,0 +1,134 @@
+import time
+from contextlib import contextmanager
+
+from django.db import connections, transaction
+
+# Helpers for the `shop_product_fts` full text index - see
+# migrations/0007_product_search_index.py
+
+TABLE = 'shop_product_fts'
+
+# Weights for bm25(), in column order: name, description, colors
+WEIGHTS = (10.0, 1.0, 5.0)
+
+# The current SQL for the index and its triggers. Migrations have their own
+# copies, frozen as they were when each migration was written, so that
+# changing this doesn't change what old migrations do. On SQLite, Django
+# rebuilds a table for most schema changes, which drops the table's triggers,
+# so any migration that alters `shop_product` or `shop_product_colors` must
+# create their triggers again afterwards, with a copy of the SQL from here
+# (see 0010_restore_product_search_triggers.py).
+
+COLORS_FOR_PRODUCT = """
+    coalesce((SELECT group_concat(c.name, ' ')
+              FROM shop_product_colors pc JOIN shop_color c ON c.id = pc.color_id
+              WHERE pc.product_id = {product_id}), '')
+"""
+
+CREATE_TABLE_SQL = f"""
+    CREATE VIRTUAL TABLE {TABLE} USING fts5(
+        name, description, colors,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+"""
+
+# Trigger name: SQL, for triggers on shop_product
+PRODUCT_TRIGGERS = {
+    'shop_product_fts_insert': f"""
+    CREATE TRIGGER shop_product_fts_insert AFTER INSERT ON shop_product BEGIN
+        INSERT INTO {TABLE}(rowid, name, description, colors)
+        VALUES (new.id, new.name, new.description, '');
+    END
+    """,
+    'shop_product_fts_update': f"""
+    CREATE TRIGGER shop_product_fts_update AFTER UPDATE OF name, description ON shop_product BEGIN
+        UPDATE {TABLE} SET name = new.name, description = new.description
+        WHERE rowid = new.id;
+    END
+    """,
+    'shop_product_fts_delete': f"""
+    CREATE TRIGGER shop_product_fts_delete AFTER DELETE ON shop_product BEGIN
+        DELETE FROM {TABLE} WHERE rowid = old.id;
+    END
+    """,
+}
+
+# For triggers on shop_product_colors and shop_color
+COLOR_TRIGGERS = {
+    'shop_product_colors_fts_insert': f"""
+    CREATE TRIGGER shop_product_colors_fts_insert AFTER INSERT ON shop_product_colors BEGIN
+        UPDATE {TABLE} SET colors = {COLORS_FOR_PRODUCT.format(product_id='new.product_id')}
+        WHERE rowid = new.product_id;
+    END
+    """,
+    'shop_product_colors_fts_delete': f"""
+    CREATE TRIGGER shop_product_colors_fts_delete AFTER DELETE ON shop_product_colors BEGIN
+        UPDATE {TABLE} SET colors = {COLORS_FOR_PRODUCT.format(product_id='old.product_id')}
+        WHERE rowid = old.product_id;
+    END
+    """,
+    'shop_color_fts_update': f"""
+    CREATE TRIGGER shop_color_fts_update AFTER UPDATE OF name ON shop_color BEGIN
+        UPDATE {TABLE} SET colors = {COLORS_FOR_PRODUCT.format(product_id=f'{TABLE}.rowid')}
+        WHERE rowid IN (SELECT product_id FROM shop_product_colors WHERE color_id = new.id);
+    END
+    """,
+}
+
+FILL_SQL = f"""
+    INSERT INTO {TABLE}(rowid, name, description, colors)
+    SELECT p.id, p.name, p.description, {COLORS_FOR_PRODUCT.format(product_id='p.id')}
+    FROM shop_product p
+"""
+
+
+def search_index_available(using='default'):
+    connection = connections[using]
+    return connection.vendor == 'sqlite' and TABLE in connection.introspection.table_names()
+
+
+def missing_search_triggers(using='default'):
+    # Names of the triggers that should keep the index up to date but don't
+    # exist - e.g. because a migration rebuilt the table they were on.
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        existing = {name for name, in cursor.fetchall()}
+    return sorted((set(PRODUCT_TRIGGERS) | set(COLOR_TRIGGERS)) - existing)
+
+
+def rebuild_search_index(using='default'):
+    # Much faster than fixing things up one product at a time: one
+    # INSERT ... SELECT, followed by merging all the index b-trees together.
+    start = time.perf_counter()
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(FILL_SQL)
+        count = cursor.rowcount
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')")
+    return count, time.perf_counter() - start
+
+
+@contextmanager
+def search_index_suspended(using='default'):
+    # For bulk loads. The triggers keeping the index up to date do an index
+    # update for every product and every product color, which is much slower
+    # than rebuilding the whole index at the end. Call inside a transaction,
+    # so that nobody sees the tables without their triggers.
+    if not search_index_available(using):
+        yield
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND sql LIKE %s",
+            [f'%{TABLE}%'],
+        )
+        triggers = cursor.fetchall()
+        for name, sql in triggers:
+            cursor.execute(f'DROP TRIGGER {name}')
+    try:
+        yield
+    finally:
+        with connections[using].cursor() as cursor:
+            for name, sql in triggers:
+                cursor.execute(sql)
+    rebuild_search_index(using)
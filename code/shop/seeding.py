@@ -0,0 +1,238 @@
+# Generated catalog data, for benchmarking at realistic sizes.
+#
+# Everything is generated from a seed, so the same arguments give the same
+# catalog. Rows are generated lazily as tuples and inserted in batches with
+# executemany(), and many-to-many memberships go straight into the through
+# tables, so that millions of rows take minutes rather than hours, without
+# holding them all in memory. (bulk_create() builds a model instance and
+# compiles SQL for every row, which made it ~10 times slower than this.)
+
+import itertools
+import random
+import time
+from contextlib import contextmanager
+
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Color, Product, SpecialOffer
+from .search_index import search_index_available, search_index_suspended
+
+ADJECTIVES = [
+    'bright', 'classic', 'cosy', 'deluxe', 'elegant', 'fluffy', 'handmade', 'light', 'modern', 'organic',
+    'plain', 'rugged', 'shiny', 'slim', 'soft', 'sturdy', 'vintage', 'warm', 'waterproof', 'woolly',
+]
+
+NOUNS = [
+    'bag', 'belt', 'boots', 'cap', 'cardigan', 'coat', 'cravat', 'dress', 'gloves', 'hanky',
+    'hat', 'jacket', 'jeans', 'jumper', 'scarf', 'shirt', 'shoes', 'shorts', 'socks', 't-shirt',
+    'tie', 'trousers', 'umbrella', 'watch',
+]
+
+COLOR_NAMES = [
+    'black', 'blue', 'brown', 'crimson', 'cyan', 'gold', 'green', 'grey', 'indigo', 'ivory',
+    'lavender', 'lime', 'magenta', 'maroon', 'navy', 'olive', 'orange', 'pink', 'purple', 'red',
+    'silver', 'teal', 'turquoise', 'violet', 'white', 'yellow',
+]
+
+# Trades durability for speed, which is fine for a database we can make again.
+# cache_size is in KiB when negative.
+BULK_LOAD_PRAGMAS = {
+    'journal_mode': 'MEMORY',
+    'synchronous': 'OFF',
+    'temp_store': 'MEMORY',
+    'cache_size': -256 * 1024,
+}
+
+
+@contextmanager
+def sqlite_bulk_load(using='default'):
+    # Sets BULK_LOAD_PRAGMAS, and puts the old values back afterwards. Does
+    # nothing for other databases. Must be used outside a transaction, because
+    # SQLite can't change journal_mode inside one.
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    with connection.cursor() as cursor:
+        previous = {}
+        for pragma, value in BULK_LOAD_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma}')
+            previous[pragma] = cursor.fetchone()[0]
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for pragma, value in previous.items():
+                cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+def bulk_insert(model, fields, rows, *, batch_size=5000, using='default'):
+    # Inserts an iterable of tuples of values for `fields` (names), in
+    # batches, returning how many. Values must be ready for the database, and
+    # fields with auto_now are set to the current time.
+    connection = connections[using]
+    opts = model._meta
+    fields = [opts.get_field(name) for name in fields]
+    now_fields = [f for f in opts.concrete_fields if getattr(f, 'auto_now', False) and f not in fields]
+    now = [f.get_db_prep_save(timezone.now(), connection) for f in now_fields]
+    columns = ', '.join(connection.ops.quote_name(f.column) for f in fields + now_fields)
+    placeholders = ', '.join(['%s'] * (len(fields) + len(now_fields)))
+    sql = f'INSERT INTO {connection.ops.quote_name(opts.db_table)} ({columns}) VALUES ({placeholders})'
+
+    rows = iter(rows)
+    count = 0
+    with connection.cursor() as cursor:
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                return count
+            if now:
+                batch = [row + tuple(now) for row in batch]
+            cursor.executemany(sql, batch)
+            count += len(batch)
+
+
+def _next_id(model, using):
+    return (model.objects.using(using).aggregate(max_id=Max('id'))['max_id'] or 0) + 1
+
+
+# Each generator yields tuples for the fields in the matching *_FIELDS
+
+COLOR_FIELDS = ['id', 'name', 'rgb']
+
+
+def generate_colors(ids, rng):
+    for i, pk in enumerate(ids):
+        name = COLOR_NAMES[i % len(COLOR_NAMES)]
+        if i >= len(COLOR_NAMES):
+            name = f'{name} {i // len(COLOR_NAMES)}'
+        yield (pk, name, f'#{rng.randrange(0x1000000):06x}')
+
+
+PRODUCT_FIELDS = ['id', 'name', 'slug', 'description']
+
+
+def generate_products(ids, rng, *, description_words=0):
+    for pk in ids:
+        yield (
+            pk,
+            f'{rng.choice(ADJECTIVES).capitalize()} {rng.choice(NOUNS)} {pk}',
+            f'product-{pk}',
+            ' '.join(rng.choices(NOUNS, k=description_words)),
+        )
+
+
+PRODUCT_COLOR_FIELDS = ['product', 'color']
+
+
+def generate_product_colors(product_ids, color_ids, rng, *, max_colors=3):
+    for pk in product_ids:
+        for color_id in rng.sample(color_ids, rng.randint(0, min(max_colors, len(color_ids)))):
+            yield (pk, color_id)
+
+
+SPECIAL_OFFER_FIELDS = ['id', 'name', 'slug', 'description']
+
+
+def generate_special_offers(ids, rng):
+    for pk in ids:
+        yield (
+            pk,
+            f'{rng.choice(ADJECTIVES).capitalize()} offer {pk}',
+            f'offer-{pk}',
+            ' '.join(rng.choices(NOUNS, k=10)),
+        )
+
+
+SPECIAL_OFFER_PRODUCT_FIELDS = ['specialoffer', 'product']
+
+
+def generate_special_offer_products(offer_ids, product_ids, rng, *, products_per_offer):
+    k = min(products_per_offer, len(product_ids))
+    for pk in offer_ids:
+        # Sorted, so that inserts go in index order
+        for product_id in sorted(rng.sample(product_ids, k)):
+            yield (pk, product_id)
+
+
+def seed_products(count, *, seed=0, description_words=0, batch_size=5000, using='default'):
+    # Adds products (and colors) until there are at least `count`.
+    rng = random.Random(seed)
+    if not Color.objects.using(using).exists():
+        Color.objects.using(using).bulk_create([Color(name=name) for name in COLOR_NAMES])
+    color_ids = list(Color.objects.using(using).values_list('id', flat=True))
+
+    start = _next_id(Product, using)
+    needed = count - Product.objects.using(using).count()
+    for batch_start in range(start, start + needed, batch_size):
+        ids = range(batch_start, min(batch_start + batch_size, start + needed))
+        bulk_insert(Product, PRODUCT_FIELDS, generate_products(ids, rng, description_words=description_words),
+                    batch_size=batch_size, using=using)
+        bulk_insert(Product.colors.through, PRODUCT_COLOR_FIELDS, generate_product_colors(ids, color_ids, rng),
+                    batch_size=batch_size, using=using)
+
+
+CATALOG_MODELS = [SpecialOffer, Product, Color]
+
+
+def clear_catalog(using='default'):
+    # Deletes every product, color and special offer, with one DELETE per
+    # table. Going through QuerySet.delete() would collect every related
+    # object first, which takes forever for big catalogs. Nothing else refers
+    # to these tables, apart from the many-to-many tables cleared first.
+    connection = connections[using]
+    tables = [field.remote_field.through._meta.db_table
+              for model in CATALOG_MODELS for field in model._meta.local_many_to_many]
+    tables += [model._meta.db_table for model in CATALOG_MODELS]
+    with connection.cursor() as cursor:
+        for table in tables:
+            cursor.execute(f'DELETE FROM {connection.ops.quote_name(table)}')
+
+
+def seed_catalog(*, products, colors, special_offers, products_per_offer, seed=0, description_words=10,
+                 batch_size=5000, using='default', progress=None, clear=False):
+    # Adds a whole catalog, in one transaction, after deleting the existing
+    # one if `clear` is true. Returns [(table, rows, seconds)], and calls
+    # `progress` with the same after each table.
+    rng = random.Random(seed)
+    results = []
+
+    def load(model, fields, rows):
+        start = time.perf_counter()
+        count = bulk_insert(model, fields, rows, batch_size=batch_size, using=using)
+        result = (model._meta.db_table, count, time.perf_counter() - start)
+        results.append(result)
+        if progress:
+            progress(*result)
+
+    def ids(model, count):
+        start = _next_id(model, using)
+        return range(start, start + count)
+
+    has_index = search_index_available(using)
+    with sqlite_bulk_load(using), transaction.atomic(using=using):
+        with search_index_suspended(using):
+            if clear:
+                clear_catalog(using)
+            color_ids = ids(Color, colors)
+            product_ids = ids(Product, products)
+            offer_ids = ids(SpecialOffer, special_offers)
+
+            load(Color, COLOR_FIELDS, generate_colors(color_ids, rng))
+            load(Product, PRODUCT_FIELDS, generate_products(product_ids, rng, description_words=description_words))
+            load(Product.colors.through, PRODUCT_COLOR_FIELDS,
+                 generate_product_colors(product_ids, list(color_ids), rng))
+            load(SpecialOffer, SPECIAL_OFFER_FIELDS, generate_special_offers(offer_ids, rng))
+            load(SpecialOffer.products.through, SPECIAL_OFFER_PRODUCT_FIELDS, generate_special_offer_products(
+                offer_ids, product_ids, rng, products_per_offer=products_per_offer))
+            index_start = time.perf_counter()
+        # search_index_suspended() rebuilds the index as it finishes
+        if has_index:
+            result = ('search index', products, time.perf_counter() - index_start)
+            results.append(result)
+            if progress:
+                progress(*result)
+    return results
@@ -0,0 +1,56 @@
+import hashlib
+
+from django import template
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from shop.projections import object_id
+
+register = template.Library()
+
+ROW_TEMPLATE = 'shop/includes/product_row.html'
+
+# Rendered rows don't need to expire, because their key changes whenever the
+# product or the row template does. This just bounds how long stale rows hang
+# around.
+ROW_TIMEOUT = 60 * 60 * 24
+
+
+@register.simple_tag
+def product_rows(products):
+    # Renders `shop/includes/product_row.html` for each product, re-using rows
+    # rendered by earlier requests (from any page that lists products). Each
+    # row is cached under the product id, its `updated_at` stamp and a hash of
+    # the row template, and all rows for a page are fetched with a single
+    # `get_many`.
+    products = list(products)
+    row_template = get_template(ROW_TEMPLATE)
+    version = template_version(row_template)
+    keys = [row_cache_key(product, version) for product in products]
+    rendered = cache.get_many([key for key in keys if key is not None])
+    new = {}
+    rows = []
+    for key, product in zip(keys, products):
+        row = rendered.get(key) if key is not None else None
+        if row is None:
+            row = row_template.render({'product': product})
+            if key is not None:
+                new[key] = row
+        rows.append(row)
+    if new:
+        cache.set_many(new, ROW_TIMEOUT)
+    return mark_safe(''.join(rows))
+
+
+def template_version(template):
+    # Changes when the template's source does (but not templates it includes).
+    return hashlib.md5(template.template.source.encode('utf-8')).hexdigest()[:12]
+
+
+def row_cache_key(product, version):
+    updated_at = product.get('updated_at') if isinstance(product, dict) else getattr(product, 'updated_at', None)
+    if updated_at is None:
+        # Can't tell if a cached row is current, so don't cache.
+        return None
+    return f'product-row:{version}:{object_id(product)}:{updated_at.timestamp()}'
@@ -0,0 +1,32 @@
+from django.test import TestCase
+
+from shop.models import Color, Product
+from shop.search_index import missing_search_triggers, search_index_available
+from the_right_way.dependency_injection.fts_search import fts_product_search
+from the_right_way.dependency_injection.search import Filter
+
+
+class SearchIndexTests(TestCase):
+
+    def setUp(self):
+        if not search_index_available():
+            self.skipTest('No full-text search index on this database')
+
+    def test_triggers_exist_after_migrating(self):
+        # On SQLite, migrations that alter a table rebuild it and drop its
+        # triggers - see migrations/0010_restore_product_search_triggers.py
+        self.assertEqual(missing_search_triggers(), [])
+
+    def test_index_follows_product_changes(self):
+        product = Product.objects.create(name='Zebra hat', slug='zebra-hat')
+        self.assertEqual(fts_product_search({Filter.NAME: 'zebra'}), [product])
+
+        product.name = 'Giraffe hat'
+        product.save()
+        self.assertEqual(fts_product_search({Filter.NAME: 'zebra'}), [])
+
+        product.colors.add(Color.objects.create(name='ochre'))
+        self.assertEqual(fts_product_search({Filter.COLOR: 'ochre'}), [product])
+
+        product.delete()
+        self.assertEqual(fts_product_search({Filter.NAME: 'giraffe'}), [])
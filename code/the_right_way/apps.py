@@ -1,19 +1,40 @@
 from django.apps import AppConfig
-from django.core.checks import Error, Tags, register
-
-from the_right_way.policies.introspection import check_policy_for_all_routes
+from django.core.checks import Error, Tags, Warning, register
 
 
 class TheRightWayConfig(AppConfig):
     name = "the_right_way"
 
     def ready(self):
-        check_policy_for_all_routes()
+        # Connect signal handlers
+        from .delegation import pagination  # noqa: F401
+        from .dependency_injection import search_cache, trigram_search  # noqa: F401
+
+        # Build the table used by check_view_policy and runtime lookups.
+        # The policies package pulls in auth views (and so models), which
+        # is why it's only imported once the app registry is ready.
+        from .policies.registry import policy_registry
+        policy_registry.ensure_built()
+
+        # Build the index used by view_source up front
+        from .views import source_files
+        source_files()
 
 
 @register(Tags.urls)
 def check_view_policy(app_configs, **kwargs):
+    from .policies.introspection import check_policy_for_all_routes
     return [
         Error(message, obj=url_pattern, id="the_right_way.TRW01")
         for message, url_pattern in check_policy_for_all_routes()
     ]
+
+
+@register(Tags.urls)
+def check_query_budgets(app_configs, **kwargs):
+    from .policies.registry import policy_registry
+    from .query_budgets import routes_without_query_budget
+    return [
+        Warning(message, obj=url_pattern, id="the_right_way.TRW02")
+        for message, url_pattern in routes_without_query_budget(policy_registry.routes)
+    ]
@@ -9,7 +9,7 @@ https://docs.djangoproject.com/en/stable/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+from the_right_way.fast_resolver import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'the_right_way.settings')
 
@@ -0,0 +1,58 @@
+# Helpers for the benchmarking management commands.
+
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+
+from accounts.models import User
+from shop.models import Product, SpecialOffer
+from shop.seeding import seed_products  # noqa: F401
+
+
+@contextmanager
+def benchmark_database(*, verbosity=0):
+    # A throwaway database, created the same way the test runner does, so that
+    # we can fill it with as much data as we like without touching the real one.
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+
+
+def seed_site(products, *, seed=0):
+    # Enough of everything for every view in the project to have something to
+    # show: products, a few special offers, and a user who is allowed to see
+    # every page. Returns the user.
+    seed_products(products, seed=seed, description_words=10)
+    product_ids = list(Product.objects.order_by('pk').values_list('pk', flat=True)[:500])
+    for i in range(3):
+        offer = SpecialOffer.objects.create(name=f'Offer {i}', slug=f'offer-{i}', description='')
+        offer.products.set(product_ids[i::3])
+    user = User.objects.create(username='benchmark', is_staff=True, is_superuser=True,
+                               is_premium=True, good_reputation=True)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return user
+
+
+def time_calls(func, *, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def median_ms(timings):
+    return statistics.median(timings) * 1000
+
+
+def percentile_ms(timings, percent):
+    if len(timings) == 1:
+        return timings[0] * 1000
+    return statistics.quantiles(timings, n=100, method='inclusive')[percent - 1] * 1000
@@ -1,9 +1,12 @@
 from django.urls import path
 
+from the_right_way.query_budgets import query_budget
+
 from . import views
 
 urlpatterns = [
-    path('checkout/start/', views.checkout_start, name='checkout_start'),
+    path('checkout/start/', query_budget(3)(views.checkout_start), name='checkout_start'),
+    path('checkout/start-cached/', views.checkout_start_cached, name='checkout_start_cached'),
 ]
 
 app_name = 'common_context_data'
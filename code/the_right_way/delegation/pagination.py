@@ -0,0 +1,295 @@
+import base64
+import binascii
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils.functional import cached_property
+
+from shop.models import Product, SpecialOffer
+from shop.projections import object_id
+
+# Keyset (or 'seek') pagination, as an alternative to Django's Paginator.
+#
+# Paginator needs a `SELECT COUNT(*)` for every page, and fetches page N using
+# `OFFSET`, which gets slower the further back you go. Instead, we order on
+# (name, id) and remember the last row we displayed, passing it to the next
+# page as an opaque `?after=` token. Fetching any page is then an index seek
+# plus `LIMIT`. The price is that there are no page numbers and no 'last' page.
+
+
+class KeysetPage:
+    # Quacks enough like django.core.paginator.Page for our templates.
+    is_keyset = True
+
+    def __init__(self, object_list, *, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def keyset_paged_object_list_context(request, products, *, paginate_by, projection=None):
+    if projection is None:
+        projection = _no_projection
+    after = decode_cursor(request.GET.get('after', ''))
+    before = decode_cursor(request.GET.get('before', ''))
+
+    if before is not None:
+        # Walk backwards from `before`, then flip the rows round for display.
+        products = products.filter(_keyset_filter(before, 'lt')).order_by('-name', '-pk')
+        rows = list(projection(products)[:paginate_by + 1])
+        more_before = len(rows) > paginate_by
+        rows = rows[:paginate_by][::-1]
+        more_after = True
+    else:
+        if after is not None:
+            products = products.filter(_keyset_filter(after, 'gt'))
+        products = products.order_by('name', 'pk')
+        rows = list(projection(products)[:paginate_by + 1])
+        more_after = len(rows) > paginate_by
+        rows = rows[:paginate_by]
+        more_before = after is not None
+
+    return {
+        'page_obj': KeysetPage(
+            rows,
+            next_cursor=encode_cursor(rows[-1]) if rows and more_after else None,
+            previous_cursor=encode_cursor(rows[0]) if rows and more_before else None,
+        ),
+    }
+
+
+def _keyset_filter(cursor, lookup):
+    name, pk = cursor
+    return Q(**{f'name__{lookup}': name}) | Q(name=name, **{f'pk__{lookup}': pk})
+
+
+def _no_projection(queryset):
+    return queryset
+
+
+def encode_cursor(obj):
+    name = obj['name'] if isinstance(obj, dict) else obj.name
+    data = json.dumps([name, object_id(obj)], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    # Like Paginator.get_page, we are forgiving of junk, and return None
+    # (i.e. start from the beginning) rather than raising an error.
+    if not token:
+        return None
+    try:
+        data = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        name, pk = json.loads(data)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    if not isinstance(name, str) or not isinstance(pk, int):
+        return None
+    return name, pk
+
+
+# Cached counts
+#
+# Paginator normally does a `SELECT COUNT(*)` on every page view. For lists
+# that change much less often than they are viewed, we can cache the count.
+# The cache key is built from the compiled SQL of the queryset, which covers
+# both where the rows come from (e.g. which special offer) and any filtering.
+#
+# Rather than try to work out which cached counts a given change affects, all
+# counts share a 'generation' number which is bumped by signal handlers below
+# whenever products or special offer membership change.
+#
+# Optionally, for big unfiltered lists we can skip counting altogether and use
+# the row count estimate the database keeps for its query planner. This is
+# only as fresh as the last `ANALYZE`, but for 'page 1 of about 40,000' that
+# is usually fine. Pages then say the count is approximate, and don't link to
+# the last page, which may be empty or not really the last. Since the estimate
+# can be low too, pages aren't limited to it: each page fetches one row more
+# than it shows, to find out whether there is a next one.
+#
+# The generation is bumped in the process that made the change. With a cache
+# each process has its own copy of, like the default LocMemCache, other
+# processes show old counts until they time out - use a shared cache (e.g.
+# Memcached or Redis) when running more than one process.
+
+
+class CountProvider:
+    def __init__(self, *, cache_alias=DEFAULT_CACHE_ALIAS, timeout=300, estimate_above=None):
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+        self.estimate_above = estimate_above
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def count(self, queryset):
+        return self.count_and_estimated(queryset)[0]
+
+    def count_and_estimated(self, queryset):
+        # Returns (count, whether it's an estimate)
+        key = self.make_key(queryset)
+        result = self.cache.get(key)
+        if result is None:
+            count = self.estimated_count(queryset)
+            result = (queryset.count(), False) if count is None else (count, True)
+            self.cache.set(key, result, self.timeout)
+        return result
+
+    def make_key(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        digest = hashlib.md5(repr((queryset.db, sql, params)).encode('utf-8')).hexdigest()
+        return f'product-count:{self.generation()}:{digest}'
+
+    def generation(self):
+        generation = self.cache.get(GENERATION_KEY)
+        if generation is None:
+            # Start from a value that can't collide with keys left over from a
+            # generation counter that was evicted.
+            generation = time.time_ns()
+            self.cache.add(GENERATION_KEY, generation, None)
+            generation = self.cache.get(GENERATION_KEY, generation)
+        return generation
+
+    def invalidate(self):
+        try:
+            self.cache.incr(GENERATION_KEY)
+        except ValueError:
+            pass  # No counts cached yet.
+
+    def estimated_count(self, queryset):
+        if self.estimate_above is None or queryset.query.where:
+            # Planner statistics are per table, so are no use for filtered
+            # querysets.
+            return None
+        estimate = planner_row_estimate(queryset.model, using=queryset.db)
+        if estimate is None or estimate < self.estimate_above:
+            return None
+        return estimate
+
+
+GENERATION_KEY = 'product-count:generation'
+
+
+def planner_row_estimate(model, *, using):
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'sqlite':
+        # Populated by `ANALYZE`. The first number in `stat` is the number of
+        # rows in the index, which is the number of rows in the table.
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s'
+    elif connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            rows = cursor.fetchall()
+    except DatabaseError:
+        # e.g. sqlite_stat1 doesn't exist until ANALYZE has been run.
+        return None
+    estimates = [int(str(row[0]).split()[0]) for row in rows if row[0] is not None]
+    if not estimates or max(estimates) < 0:
+        return None
+    return max(estimates)
+
+
+class CachedCountPaginator(Paginator):
+    def __init__(self, object_list, per_page, *, counter, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.counter = counter
+
+    @cached_property
+    def _count(self):
+        return self.counter.count_and_estimated(self.object_list)
+
+    @property
+    def count(self):
+        return self._count[0]
+
+    @property
+    def count_is_estimate(self):
+        return self._count[1]
+
+    def validate_number(self, number):
+        if not self.count_is_estimate:
+            return super().validate_number(number)
+        # As Paginator, but pages after the estimated last one are allowed.
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        if not self.count_is_estimate:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        return EstimatedCountPage(rows[:self.per_page], number, self, has_next=len(rows) > self.per_page)
+
+    def get_page(self, number):
+        if not self.count_is_estimate:
+            return super().get_page(number)
+        try:
+            return self.page(number)
+        except PageNotAnInteger:
+            return self.page(1)
+        except EmptyPage:
+            # We don't know where the real last page is, so start again.
+            return self.page(1)
+
+
+class EstimatedCountPage(Page):
+    def __init__(self, object_list, number, paginator, *, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+    def end_index(self):
+        return self.start_index() + len(self) - 1
+
+
+product_counts = CountProvider(
+    estimate_above=getattr(settings, 'PRODUCT_COUNT_ESTIMATE_ABOVE', None),
+)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(m2m_changed, sender=SpecialOffer.products.through)
+def invalidate_product_counts(**kwargs):
+    product_counts.invalidate()
@@ -1,10 +1,24 @@
 from django.urls import path
 
+from the_right_way.query_budgets import query_budget
+
 from . import views
+from .pagination import keyset_paged_object_list_context
+
+keyset = {'paginate': keyset_paged_object_list_context}
 
+# Query budgets include the session and user - see query_budgets.py
 urlpatterns = [
-    path('special-offers/<slug:slug>/', views.special_offer_detail, name='special_offer_detail'),
-    path('products/', views.product_list, name='product_list'),
+    path('special-offers/<slug:slug>/', query_budget(5)(views.special_offer_detail), name='special_offer_detail'),
+    path('products/', query_budget(2)(views.product_list), name='product_list'),
+    # Aside, with caching:
+    path('special-offers-cached/<slug:slug>/', views.special_offer_detail_cached,
+         name='special_offer_detail_cached'),
+    path('products-cached/', views.product_list_cached, name='product_list_cached'),
+    # and using keyset pagination:
+    path('special-offers-keyset/<slug:slug>/', views.special_offer_detail_cached, keyset,
+         name='special_offer_detail_keyset'),
+    path('products-keyset/', views.product_list_cached, keyset, name='product_list_keyset'),
 ]
 
 app_name = 'delegation'
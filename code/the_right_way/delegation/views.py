@@ -1,8 +1,14 @@
 from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404
 from django.template.response import TemplateResponse
+from django.views.decorators.http import condition
 
 from shop.models import Product, SpecialOffer
+from shop.object_cache import get_cached_or_404, special_offer_etag, special_offer_last_modified
+from shop.projections import product_list_rows
+from the_right_way.query_budgets import query_budget
+
+from .pagination import CachedCountPaginator, product_counts
 
 
 def product_list(request):
@@ -47,3 +53,56 @@ def paged_object_list_context(request, products, *, paginate_by):
     return {
         'page_obj': page_obj,
     }
+
+
+# Aside, not part of the pattern: the same views with caching. The special
+# offer is cached, and clients that already have the current version of the
+# page get a 304 (see shop/object_cache.py, including its limits). Only the
+# fields the templates use are loaded (shop/projections.py), counts are cached
+# (pagination.py), and `paginate` can swap in keyset pagination. It's the
+# same delegation, with a couple more parameters.
+@query_budget(2)
+def product_list_cached(request, paginate=None):
+    return display_product_list_cached(
+        request,
+        queryset=Product.objects.all(),
+        template_name='shop/product_list.html',
+        paginate=paginate,
+    )
+
+
+@query_budget(5)
+@condition(etag_func=special_offer_etag, last_modified_func=special_offer_last_modified)
+def special_offer_detail_cached(request, slug, paginate=None):
+    special_offer = get_cached_or_404(SpecialOffer, slug)
+    return display_product_list_cached(
+        request,
+        context={
+            'special_offer': special_offer,
+        },
+        queryset=special_offer.get_products(),
+        template_name='shop/special_offer_detail.html',
+        paginate=paginate,
+    )
+
+
+def display_product_list_cached(request, *, context=None, queryset, template_name, paginate=None,
+                                projection=product_list_rows):
+    if context is None:
+        context = {}
+    if paginate is None:
+        paginate = cached_count_paged_object_list_context
+    queryset = apply_product_filtering(request, queryset)
+    context |= paginate(request, queryset, paginate_by=5, projection=projection)
+    return TemplateResponse(request, template_name, context)
+
+
+def cached_count_paged_object_list_context(request, products, *, paginate_by, projection=None):
+    if projection is not None:
+        products = projection(products)
+    paginator = CachedCountPaginator(products, paginate_by, counter=product_counts)
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
+    return {
+        'page_obj': page_obj,
+    }
@@ -6,6 +6,7 @@ from shop.models import SpecialOffer
 from .search import Filter
 from .search import product_search as all_product_search
 from .search import special_product_search
+from .view_log import record_special_offer_view
 
 
 class ProductSearchBase(TemplateView):
@@ -65,4 +66,5 @@ def collect_filtering_parameters(request):
 
 
 def log_special_offer_product_view(user, special_offer, products):
-    print(user, special_offer, products)
+    # Buffered and written from a background thread - see view_log.py
+    record_special_offer_view(user, special_offer, products)
@@ -0,0 +1,80 @@
+# An alternative product search backend, using SQLite's FTS5 full text search.
+#
+# The `shop_product_fts` table mirrors product names, descriptions and color
+# names, and is kept up to date by triggers (see shop/search_index.py). Unlike
+# `icontains`, searching it uses an index. We do prefix matching on each word
+# of the search, so 'wool' finds 'woolly', and order by relevance (bm25).
+
+import re
+
+from django.db import connection
+
+from shop.models import Product, SpecialOffer
+from shop.search_index import TABLE, WEIGHTS, search_index_available
+
+from .search import PAGE_SIZE, Filter, _search
+from .trigram_search import fetch_in_order
+
+
+def fts_product_search(filters, *, page=1, projection=None):
+    return _fts_search(filters, page=page, projection=projection)
+
+
+def fts_special_product_search(filters, special_offer, *, page=1, projection=None):
+    return _fts_search(filters, special_offer=special_offer, page=page, projection=projection)
+
+
+def _fts_search(filters, *, special_offer=None, page=1, projection=None):
+    match = match_expression(filters)
+    if match is None or not _index_available():
+        # Nothing to rank by, or no index - use the QuerySet implementation.
+        products = Product.objects.all() if special_offer is None else special_offer.get_products()
+        return _search(filters, products, page=page, projection=projection)
+
+    sql = f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s'
+    params = [match]
+    if special_offer is not None:
+        through = SpecialOffer.products.through._meta.db_table
+        sql += f' AND rowid IN (SELECT product_id FROM {through} WHERE specialoffer_id = %s)'
+        params.append(special_offer.pk)
+    sql += f' ORDER BY bm25({TABLE}, {", ".join(map(str, WEIGHTS))}) LIMIT %s OFFSET %s'
+    params.extend([PAGE_SIZE, (page - 1) * PAGE_SIZE])
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        ids = [row[0] for row in cursor.fetchall()]
+    return fetch_in_order(ids, projection=projection)
+
+
+def match_expression(filters):
+    parts = []
+    if Filter.NAME in filters:
+        parts.append(_column_match('{name description}', filters[Filter.NAME]))
+    if Filter.COLOR in filters:
+        parts.append(_column_match('colors', filters[Filter.COLOR]))
+    if not parts or None in parts:
+        return None
+    return ' AND '.join(parts)
+
+
+def _column_match(columns, text):
+    # Every word must match as a prefix. Words are quoted, so that nothing the
+    # user types is interpreted as FTS5 query syntax.
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    return f'{columns} : ({" ".join(f"{_quote(word)}*" for word in words)})'
+
+
+def _quote(word):
+    return '"' + word.replace('"', '""') + '"'
+
+
+_available = False
+
+
+def _index_available():
+    global _available
+    if not _available:
+        _available = search_index_available(connection.alias)
+    return _available
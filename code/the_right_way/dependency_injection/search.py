@@ -1,5 +1,6 @@
 # Our (pretend) product search API module
 
+from asgiref.sync import sync_to_async
 
 from shop.models import Product
 
@@ -16,15 +17,18 @@ PAGE_SIZE = 5
 # here, but in a real project we might be using something not QuerySet based
 # e.g. external HTTP API or ElasticSearch or something
 
-def special_product_search(filters, special_offer, *, page=1):
-    return _search(filters, special_offer.get_products(), page=page)
+# Searchers optionally take a `projection` to load less data - see
+# shop/projections.py
 
+def special_product_search(filters, special_offer, *, page=1, projection=None):
+    return _search(filters, special_offer.get_products(), page=page, projection=projection)
 
-def product_search(filters, *, page=1):
-    return _search(filters, Product.objects.all(), page=page)
 
+def product_search(filters, *, page=1, projection=None):
+    return _search(filters, Product.objects.all(), page=page, projection=projection)
 
-def _search(filters, products, *, page=1):
+
+def _search(filters, products, *, page=1, projection=None):
     if Filter.NAME in filters:
         products = products.filter(name__icontains=filters[Filter.NAME])
     if Filter.COLOR in filters:
@@ -32,5 +36,21 @@ def _search(filters, products, *, page=1):
 
     # paging
     start = (page - 1) * PAGE_SIZE
-    products = list(products.order_by('name')[start:start + PAGE_SIZE])
+    products = products.order_by('name')
+    if projection is not None:
+        products = projection(products)
+    products = list(products[start:start + PAGE_SIZE])
     return products
+
+
+# Async versions. With a real search API these would use an async HTTP client,
+# so that the request latency can overlap with other work in the view - see
+# views.display_product_list_async. Here, we just run the QuerySet version in
+# a thread.
+
+async def async_special_product_search(filters, special_offer, *, page=1, projection=None):
+    return await sync_to_async(special_product_search)(filters, special_offer, page=page, projection=projection)
+
+
+async def async_product_search(filters, *, page=1, projection=None):
+    return await sync_to_async(product_search)(filters, page=page, projection=projection)
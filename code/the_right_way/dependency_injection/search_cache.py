@@ -0,0 +1,142 @@
+# Caching for searchers.
+#
+# `CachedSearcher` wraps any searcher function (see search.py) and caches its
+# results, keyed on the searcher, the filters (as produced by
+# `collect_filtering_parameters`), any special offer, the page and the
+# projection. Eviction (LRU with a maximum size, and a TTL) is done by the
+# cache backend - see the 'search' cache in settings.CACHES.
+#
+# Any change to products, colors or special offers bumps a 'generation'
+# number that is part of every key, so everything cached before the change is
+# simply never looked at again, and eventually gets evicted. The generation
+# lives in the cache, so with a cache each process has its own copy of (like
+# LocMemCache, the default), other processes keep serving old results until
+# they time out. Use a shared cache (e.g. Memcached or Redis) when running
+# more than one process.
+
+import hashlib
+import string
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.db.models import Model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from shop.models import Color, Product, SpecialOffer
+
+from .search import product_search, special_product_search
+
+GENERATION_KEY = 'search:generation'
+
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+class CachedSearcher:
+    def __init__(self, searcher, *, cache_alias=None, timeout=None):
+        self.searcher = searcher
+        self.name = _name(searcher)
+        if cache_alias is None:
+            cache_alias = 'search' if 'search' in settings.CACHES else DEFAULT_CACHE_ALIAS
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Keys we've stored recently, and when they expire, so that we can
+        # tell when the backend has evicted something early.
+        self._stored = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def __call__(self, filters, *args, page=1, **kwargs):
+        key = self.make_key(filters, args, page, kwargs)
+        products = self.cache.get(key, _MISSING)
+        if products is not _MISSING:
+            with self._lock:
+                self.hits += 1
+            return products
+
+        with self._lock:
+            self.misses += 1
+            expires = self._stored.pop(key, None)
+            if expires is not None and expires > time.monotonic():
+                self.evictions += 1
+
+        products = self.searcher(filters, *args, page=page, **kwargs)
+        timeout = self.cache.default_timeout if self.timeout is None else self.timeout
+        self.cache.set(key, products, timeout)
+        with self._lock:
+            self._stored[key] = time.monotonic() + (timeout if timeout is not None else float('inf'))
+            if len(self._stored) > 10000:
+                self._stored.popitem(last=False)
+        return products
+
+    def make_key(self, filters, args, page, kwargs):
+        # Our searchers ignore case, so 'Hat' and 'hat ' share an entry - but
+        # only for ASCII, because that's all SQLite's LIKE ignores case for.
+        parts = [
+            self.name,
+            sorted((name, value.strip().translate(_ASCII_LOWER)) for name, value in filters.items()),
+            [_key_part(arg) for arg in args],
+            page,
+            sorted((name, _key_part(value)) for name, value in kwargs.items()),
+        ]
+        digest = hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+        return f'search:{search_generation(self.cache)}:{digest}'
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+_MISSING = object()
+
+
+def _name(obj):
+    return f'{obj.__module__}.{obj.__qualname__}'
+
+
+def _key_part(value):
+    if isinstance(value, Model):
+        return f'{value._meta.label}:{value.pk}'
+    if callable(value):
+        return _name(value)
+    return value
+
+
+def search_generation(cache):
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Start from a value that can't collide with keys left over from a
+        # generation counter that was evicted.
+        generation = time.time_ns()
+        cache.add(GENERATION_KEY, generation, None)
+        generation = cache.get(GENERATION_KEY, generation)
+    return generation
+
+
+cached_product_search = CachedSearcher(product_search)
+cached_special_product_search = CachedSearcher(special_product_search)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Color)
+@receiver(post_delete, sender=Color)
+@receiver(post_save, sender=SpecialOffer)
+@receiver(post_delete, sender=SpecialOffer)
+@receiver(m2m_changed, sender=Product.colors.through)
+@receiver(m2m_changed, sender=SpecialOffer.products.through)
+def invalidate_search_caches(**kwargs):
+    for alias in {cached_product_search.cache_alias, cached_special_product_search.cache_alias}:
+        try:
+            caches[alias].incr(GENERATION_KEY)
+        except ValueError:
+            pass  # Nothing cached yet.
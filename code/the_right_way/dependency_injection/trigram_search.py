@@ -0,0 +1,298 @@
+# An alternative product search backend, using an in-process trigram index.
+#
+# `search._search` uses `icontains`, which means a full table scan (plus a
+# join for colors) for every search. Instead, we keep an inverted index from
+# every 3 character sequence ('trigram') to the products whose name contains it,
+# and similarly for color names. A substring search then only has to look at
+# products that contain every trigram of the search term.
+#
+# The index is built on first use and then kept up to date by the signal
+# handlers at the bottom. It lives in process memory, so every worker process
+# has its own copy, and changes that bypass signals (e.g. `QuerySet.update()`,
+# or other processes) are not seen until the process restarts.
+
+import heapq
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from shop.models import Color, Product
+from shop.projections import object_id
+
+from .search import PAGE_SIZE, Filter
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.clear()
+        # Updates that arrive while building - see apply()
+        self.building = False
+        self._pending = []
+        self._pending_lock = threading.Lock()
+
+    def build(self):
+        with self._pending_lock:
+            self.building = True
+            self._pending = []
+        try:
+            self._build()
+        finally:
+            with self._pending_lock:
+                self.building = False
+                pending, self._pending = self._pending, []
+                if self.built:
+                    for method, args, kwargs in pending:
+                        method(*args, **kwargs)
+
+    def _build(self):
+        names = {}
+        name_trigrams = defaultdict(set)
+        for pk, name in Product.objects.values_list('id', 'name').iterator():
+            name = name.lower()
+            names[pk] = name
+            for trigram in trigrams(name):
+                name_trigrams[trigram].add(pk)
+
+        color_names = {}
+        color_trigrams = defaultdict(set)
+        for pk, name in Color.objects.values_list('id', 'name').iterator():
+            name = name.lower()
+            color_names[pk] = name
+            for trigram in trigrams(name):
+                color_trigrams[trigram].add(pk)
+
+        product_colors = defaultdict(set)
+        color_products = defaultdict(set)
+        for product_id, color_id in Product.colors.through.objects.values_list('product_id', 'color_id').iterator():
+            product_colors[product_id].add(color_id)
+            color_products[color_id].add(product_id)
+
+        with self.lock:
+            self.names = names
+            self.name_trigrams = name_trigrams
+            self.color_names = color_names
+            self.color_trigrams = color_trigrams
+            self.product_colors = product_colors
+            self.color_products = color_products
+            self._sorted_ids = None
+            self.built = True
+
+    def clear(self):
+        with self.lock:
+            self.__dict__.update(names={}, name_trigrams={}, color_names={}, color_trigrams={},
+                                 product_colors={}, color_products={}, _sorted_ids=None, built=False)
+
+    def apply(self, method, *args, **kwargs):
+        # Applies an update (one of the methods below). A build might have
+        # read the database before the change, and would then replace the
+        # index without it, so updates that arrive during a build are queued
+        # and applied afterwards. Before the first build there's no index to
+        # update.
+        with self._pending_lock:
+            if self.building:
+                self._pending.append((method, args, kwargs))
+                return
+            if not self.built:
+                return
+        method(*args, **kwargs)
+
+    def ensure_built(self):
+        if not self.built:
+            with self.lock:
+                if not self.built:
+                    self.build()
+
+    # Searching
+
+    # Returns a page of product ids matching `filters`, best matches first.
+    # `within` optionally restricts the results to a set of product ids.
+    def search_ids(self, filters, *, page=1, within=None):
+        self.ensure_built()
+        with self.lock:
+            ids = within
+            if Filter.NAME in filters:
+                ids = _intersect(ids, self._match(filters[Filter.NAME], self.names, self.name_trigrams))
+            if Filter.COLOR in filters:
+                color_ids = self._match(filters[Filter.COLOR], self.color_names, self.color_trigrams)
+                product_ids = set()
+                for color_id in color_ids:
+                    product_ids |= self.color_products.get(color_id, set())
+                ids = _intersect(ids, product_ids)
+            # We only need to rank as far as the end of the requested page.
+            end = page * PAGE_SIZE
+            ranked = self._rank(ids, filters.get(Filter.NAME, '').lower(), limit=end)
+        return ranked[end - PAGE_SIZE:end]
+
+    def _match(self, term, names, index):
+        term = term.lower()
+        if len(term) < 3:
+            # Too short for trigrams, have to look at everything.
+            return {pk for pk, name in names.items() if term in name}
+        postings = sorted((index.get(trigram, set()) for trigram in trigrams(term)), key=len)
+        candidates = set.intersection(*postings)
+        # Having all the trigrams doesn't mean they are in the right order.
+        return {pk for pk in candidates if term in names[pk]}
+
+    def _rank(self, ids, term, *, limit):
+        names = self.names
+        if ids is None:
+            return self.sorted_ids()
+        ids = [pk for pk in ids if pk in names]
+        if not term:
+            # Alphabetical, like the QuerySet implementation.
+            return heapq.nsmallest(limit, ids, key=lambda pk: (names[pk], pk))
+
+        def rank(pk):
+            name = names[pk]
+            if name.startswith(term):
+                position = 0
+            elif f' {term}' in name:
+                position = 1
+            else:
+                position = 2
+            return (position, name, pk)
+
+        return heapq.nsmallest(limit, ids, key=rank)
+
+    def sorted_ids(self):
+        if self._sorted_ids is None:
+            self._sorted_ids = sorted(self.names, key=lambda pk: (self.names[pk], pk))
+        return self._sorted_ids
+
+    # Incremental updates
+
+    def update_product(self, pk, name):
+        with self.lock:
+            self.remove_product(pk)
+            name = name.lower()
+            self.names[pk] = name
+            for trigram in trigrams(name):
+                self.name_trigrams[trigram].add(pk)
+            self._sorted_ids = None
+
+    def remove_product(self, pk, *, colors=False):
+        with self.lock:
+            old_name = self.names.pop(pk, None)
+            if old_name is not None:
+                for trigram in trigrams(old_name):
+                    self.name_trigrams[trigram].discard(pk)
+            if colors:
+                for color_id in self.product_colors.pop(pk, ()):
+                    self.color_products[color_id].discard(pk)
+            self._sorted_ids = None
+
+    def update_color(self, pk, name):
+        with self.lock:
+            self.remove_color(pk, memberships=False)
+            name = name.lower()
+            self.color_names[pk] = name
+            for trigram in trigrams(name):
+                self.color_trigrams[trigram].add(pk)
+
+    def remove_color(self, pk, *, memberships=True):
+        with self.lock:
+            old_name = self.color_names.pop(pk, None)
+            if old_name is not None:
+                for trigram in trigrams(old_name):
+                    self.color_trigrams[trigram].discard(pk)
+            if memberships:
+                for product_id in self.color_products.pop(pk, ()):
+                    self.product_colors[product_id].discard(pk)
+
+    def add_product_colors(self, product_id, color_ids):
+        with self.lock:
+            for color_id in color_ids:
+                self.product_colors[product_id].add(color_id)
+                self.color_products[color_id].add(product_id)
+
+    def remove_product_colors(self, product_id, color_ids=None):
+        with self.lock:
+            if color_ids is None:
+                color_ids = set(self.product_colors.get(product_id, ()))
+            for color_id in color_ids:
+                self.product_colors[product_id].discard(color_id)
+                self.color_products[color_id].discard(product_id)
+
+
+def _intersect(ids, other):
+    return set(other) if ids is None else ids & other
+
+
+product_index = TrigramIndex()
+
+
+# Searchers, with the same signatures as those in search.py
+
+def trigram_product_search(filters, *, page=1, projection=None):
+    return fetch_in_order(product_index.search_ids(filters, page=page), projection=projection)
+
+
+def trigram_special_product_search(filters, special_offer, *, page=1, projection=None):
+    within = set(special_offer.products.values_list('id', flat=True))
+    return fetch_in_order(product_index.search_ids(filters, page=page, within=within), projection=projection)
+
+
+def fetch_in_order(ids, *, projection=None):
+    products = Product.objects.filter(pk__in=ids)
+    if projection is not None:
+        products = projection(products)
+    products = {object_id(product): product for product in products}
+    return [products[pk] for pk in ids if pk in products]
+
+
+# Keeping the index up to date. We wait until the transaction commits, so that
+# a rollback can't leave the index out of step with the database.
+
+def _when_built(method, *args, **kwargs):
+    transaction.on_commit(lambda: product_index.apply(method, *args, **kwargs))
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    _when_built(product_index.update_product, instance.pk, instance.name)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    _when_built(product_index.remove_product, instance.pk, colors=True)
+
+
+@receiver(post_save, sender=Color)
+def index_color(sender, instance, **kwargs):
+    _when_built(product_index.update_color, instance.pk, instance.name)
+
+
+@receiver(post_delete, sender=Color)
+def unindex_color(sender, instance, **kwargs):
+    _when_built(product_index.remove_color, instance.pk)
+
+
+@receiver(m2m_changed, sender=Product.colors.through)
+def index_product_colors(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        # instance is a Product, pk_set are Color ids
+        pairs = [(instance.pk, pk_set)]
+    elif action == 'post_clear':
+        # instance is a Color, and all its products have been removed.
+        pairs = [(product_id, {instance.pk}) for product_id in product_index.color_products.get(instance.pk, ())]
+    else:
+        pairs = [(product_id, {instance.pk}) for product_id in pk_set]
+
+    for product_id, color_ids in pairs:
+        if action == 'post_add':
+            _when_built(product_index.add_product_colors, product_id, color_ids)
+        elif action == 'post_remove':
+            _when_built(product_index.remove_product_colors, product_id, color_ids)
+        else:
+            _when_built(product_index.remove_product_colors, product_id,
+                        None if not reverse else color_ids)
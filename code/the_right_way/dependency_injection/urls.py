@@ -1,10 +1,34 @@
 from django.urls import path
 
+from the_right_way.query_budgets import query_budget
+
 from . import views
+from .fts_search import fts_product_search, fts_special_product_search
+from .search_cache import cached_product_search, cached_special_product_search
+from .trigram_search import trigram_product_search, trigram_special_product_search
 
+# Query budgets include the session and user, and the searcher's queries -
+# e.g. the trigram searcher builds its index on first use. See
+# query_budgets.py
 urlpatterns = [
-    path('special-offers/<slug:slug>/', views.special_offer_detail, name='special_offer_detail'),
-    path('products/', views.product_list, name='product_list'),
+    path('special-offers/<slug:slug>/', query_budget(8)(views.special_offer_detail), name='special_offer_detail'),
+    path('products/', query_budget(4)(views.product_list), name='product_list'),
+    # Same views, with a different search backend, or cached results:
+    path('special-offers-trigram/<slug:slug>/', query_budget(8)(views.special_offer_detail),
+         {'special_searcher': trigram_special_product_search}, name='special_offer_detail_trigram'),
+    path('products-trigram/', query_budget(4)(views.product_list),
+         {'searcher': trigram_product_search}, name='product_list_trigram'),
+    path('special-offers-fts/<slug:slug>/', query_budget(8)(views.special_offer_detail),
+         {'special_searcher': fts_special_product_search}, name='special_offer_detail_fts'),
+    path('products-fts/', query_budget(4)(views.product_list),
+         {'searcher': fts_product_search}, name='product_list_fts'),
+    path('special-offers-cached/<slug:slug>/', query_budget(8)(views.special_offer_detail),
+         {'special_searcher': cached_special_product_search}, name='special_offer_detail_cached'),
+    path('products-cached/', query_budget(4)(views.product_list),
+         {'searcher': cached_product_search}, name='product_list_cached'),
+    # Async versions:
+    path('special-offers-async/<slug:slug>/', views.special_offer_detail_async, name='special_offer_detail_async'),
+    path('products-async/', views.product_list_async, name='product_list_async'),
 ]
 
 app_name = 'dependency_injection'
@@ -0,0 +1,232 @@
+# Logging of special offer product views, off the request/response path.
+#
+# Views call `record_special_offer_view()`, which just puts an event on a
+# bounded queue. A background thread takes events off the queue and hands them
+# to a 'writer' in batches. If the queue is full (the writer can't keep up),
+# events are dropped, or the request waits briefly for space, depending on the
+# OVERFLOW setting. Whatever is still queued is flushed when the process exits,
+# and events recorded after that are dropped.
+#
+# Configured with the SPECIAL_OFFER_VIEW_LOG setting, e.g.:
+#
+#   SPECIAL_OFFER_VIEW_LOG = {
+#       'WRITER': 'the_right_way.dependency_injection.view_log.SQLiteWriter',
+#       'OPTIONS': {'path': '/var/log/shop/special_offer_views.sqlite3'},
+#       'MAX_QUEUE_SIZE': 10000,
+#       'BATCH_SIZE': 500,
+#       'FLUSH_INTERVAL': 1.0,
+#       'OVERFLOW': 'drop',  # or 'block'
+#   }
+#
+# Without a 'path', each writer has its own file in DATA_DIR.
+
+import atexit
+import functools
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def _data_path(filename):
+    os.makedirs(settings.DATA_DIR, exist_ok=True)
+    return os.path.join(settings.DATA_DIR, filename)
+
+
+class JSONLinesWriter:
+    def __init__(self, path=None):
+        self.path = path
+
+    def write(self, events):
+        if self.path is None:
+            self.path = _data_path('special_offer_views.jsonl')
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(json.dumps(event) + '\n' for event in events)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class SQLiteWriter:
+    def __init__(self, path=None):
+        self.path = path
+        self.connection = None
+
+    def write(self, events):
+        if self.connection is None:
+            # Created lazily, so that it belongs to the background thread.
+            if self.path is None:
+                self.path = _data_path('special_offer_views.sqlite3')
+            self.connection = sqlite3.connect(self.path)
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS special_offer_view (
+                    time REAL, user_id INTEGER, special_offer_id INTEGER, product_ids TEXT
+                )
+            """)
+        with self.connection:
+            self.connection.executemany(
+                'INSERT INTO special_offer_view (time, user_id, special_offer_id, product_ids) VALUES (?, ?, ?, ?)',
+                [(e['time'], e['user_id'], e['special_offer_id'], json.dumps(e['product_ids'])) for e in events],
+            )
+
+
+class NullWriter:
+    # Throws events away, e.g. for tests.
+    def write(self, events):
+        pass
+
+
+class BufferedEventSink:
+    DROP = 'drop'
+    BLOCK = 'block'
+
+    def __init__(self, writer, *, max_queue_size=10000, batch_size=500, flush_interval=1.0,
+                 overflow=DROP, block_timeout=0.1):
+        if overflow not in (self.DROP, self.BLOCK):
+            raise ValueError(f'overflow must be {self.DROP!r} or {self.BLOCK!r}, not {overflow!r}')
+        self.writer = writer
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.queued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+        self._stats_lock = threading.Lock()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stopping = False
+
+    def emit(self, event):
+        if self._stopping:
+            # Closed - nothing would write it.
+            with self._stats_lock:
+                self.dropped += 1
+            return False
+        if self._thread is None:
+            self._start()
+        try:
+            if self.overflow == self.BLOCK:
+                self.queue.put(event, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(event)
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            return False
+        with self._stats_lock:
+            self.queued += 1
+        return True
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'queued': self.queued,
+                'flushed': self.flushed,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'pending': self.queue.qsize(),
+            }
+
+    def close(self, timeout=5.0):
+        # Flushes everything queued so far, and stops the background thread.
+        if self._stopping:
+            return
+        self._stopping = True
+        if self._thread is None:
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning('Could not stop BufferedEventSink, %d events not flushed', self.queue.qsize())
+            return
+        self._thread.join(timeout)
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='BufferedEventSink', daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    event = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if event is _STOP:
+                    stopping = True
+                    break
+                batch.append(event)
+            if batch:
+                self._flush(batch)
+        # Events that got in just before close() did
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._flush(batch)
+
+    def _flush(self, batch):
+        try:
+            self.writer.write(batch)
+        except Exception:
+            logger.exception('Failed to write %d events', len(batch))
+            with self._stats_lock:
+                self.failed += len(batch)
+        else:
+            with self._stats_lock:
+                self.flushed += len(batch)
+
+
+_STOP = object()
+
+
+@functools.lru_cache(maxsize=None)
+def get_special_offer_view_sink():
+    config = settings.SPECIAL_OFFER_VIEW_LOG
+    writer = import_string(config['WRITER'])(**config.get('OPTIONS', {}))
+    return BufferedEventSink(
+        writer,
+        max_queue_size=config.get('MAX_QUEUE_SIZE', 10000),
+        batch_size=config.get('BATCH_SIZE', 500),
+        flush_interval=config.get('FLUSH_INTERVAL', 1.0),
+        overflow=config.get('OVERFLOW', BufferedEventSink.DROP),
+    )
+
+
+@receiver(setting_changed)
+def reset_special_offer_view_sink(setting, **kwargs):
+    # So that tests can change the writer with override_settings()
+    if setting == 'SPECIAL_OFFER_VIEW_LOG' and get_special_offer_view_sink.cache_info().currsize:
+        get_special_offer_view_sink().close()
+        get_special_offer_view_sink.cache_clear()
+
+
+def record_special_offer_view(user, special_offer, products):
+    # Only plain data goes on the queue - no model instances.
+    get_special_offer_view_sink().emit({
+        'time': time.time(),
+        'user_id': user.pk,
+        'special_offer_id': special_offer.pk,
+        'product_ids': [product.pk for product in products],
+    })
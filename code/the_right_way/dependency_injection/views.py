@@ -1,24 +1,32 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import get_object_or_404
 from django.template.response import TemplateResponse
 
 from shop.models import SpecialOffer
+from shop.projections import product_list_rows
+from the_right_way.query_budgets import query_budget
 
-from .search import Filter, product_search, special_product_search
+from .search import (Filter, async_product_search, async_special_product_search, product_search,
+                     special_product_search)
+from .view_log import record_special_offer_view
 
 
-def product_list(request):
+def product_list(request, searcher=product_search):
     return display_product_list(
         request,
-        searcher=product_search,
+        searcher=searcher,
         template_name='shop/product_list_unpaged.html',
+        projection=product_list_rows,
     )
 
 
-def special_offer_detail(request, slug):
+def special_offer_detail(request, slug, special_searcher=special_product_search):
     special_offer = get_object_or_404(SpecialOffer.objects.all(), slug=slug)
 
-    def special_product_search_wrapper(filters, page=1):
-        products = special_product_search(filters, special_offer, page=page)
+    def special_product_search_wrapper(filters, page=1, **kwargs):
+        products = special_searcher(filters, special_offer, page=page, **kwargs)
         log_special_offer_product_view(request.user, special_offer, products)
         return products
 
@@ -29,21 +37,95 @@ def special_offer_detail(request, slug):
         },
         searcher=special_product_search_wrapper,
         template_name='shop/special_offer_detail_unpaged.html',
+        projection=product_list_rows,
+    )
+
+
+def display_product_list(request, *, context=None, searcher, template_name, projection=None):
+    # Views can pass a `projection` for the searcher to load only the fields
+    # their template needs - see shop/projections.py. Without one, searchers
+    # are called as `searcher(filters, page=page)`.
+    if context is None:
+        context = {}
+    filters = collect_filtering_parameters(request)
+    try:
+        page = int(request.GET['page'])
+    except (KeyError, ValueError):
+        page = 1
+    context['products'] = searcher(filters, page=page, **projection_kwargs(projection))
+    return TemplateResponse(request, template_name, context)
+
+
+# Async versions of the above. The searcher and any `context_providers` (a
+# dictionary of context name to function taking the request) can be `async def`
+# functions or normal ones, and are run concurrently. Things that depend on each
+# other, like fetching the special offer before searching it, are awaited in
+# turn.
+
+@query_budget(4)
+async def product_list_async(request, searcher=async_product_search):
+    return await display_product_list_async(
+        request,
+        searcher=searcher,
+        template_name='shop/product_list_unpaged.html',
+        projection=product_list_rows,
+    )
+
+
+@query_budget(8)
+async def special_offer_detail_async(request, slug, special_searcher=async_special_product_search):
+    special_offer = await sync_to_async(get_object_or_404)(SpecialOffer.objects.all(), slug=slug)
+
+    async def special_product_search_wrapper(filters, page=1, **kwargs):
+        products = await special_searcher(filters, special_offer, page=page, **kwargs)
+        await sync_to_async(log_special_offer_product_view)(request.user, special_offer, products)
+        return products
+
+    return await display_product_list_async(
+        request,
+        context={
+            'special_offer': special_offer,
+        },
+        searcher=special_product_search_wrapper,
+        template_name='shop/special_offer_detail_unpaged.html',
+        projection=product_list_rows,
     )
 
 
-def display_product_list(request, *, context=None, searcher, template_name):
+async def display_product_list_async(request, *, context=None, context_providers=None, searcher, template_name,
+                                     projection=None):
     if context is None:
         context = {}
+    if context_providers is None:
+        context_providers = {}
     filters = collect_filtering_parameters(request)
     try:
         page = int(request.GET['page'])
     except (KeyError, ValueError):
         page = 1
-    context['products'] = searcher(filters, page=page)
+    names = ['products', *context_providers]
+    values = await asyncio.gather(
+        call_async(searcher, filters, page=page, **projection_kwargs(projection)),
+        *(call_async(provider, request) for provider in context_providers.values()),
+    )
+    context.update(zip(names, values))
     return TemplateResponse(request, template_name, context)
 
 
+async def call_async(func, *args, **kwargs):
+    if asyncio.iscoroutinefunction(func):
+        return await func(*args, **kwargs)
+    # Normal functions (e.g. anything using the ORM) run in a thread, so they
+    # overlap with async ones.
+    return await sync_to_async(func)(*args, **kwargs)
+
+
+def projection_kwargs(projection):
+    # Searchers that don't know about projections still work, as long as
+    # we don't ask for one.
+    return {} if projection is None else {'projection': projection}
+
+
 FILTER_MAPPING = {
     'q': Filter.NAME,
     'color': Filter.COLOR,
@@ -60,4 +142,5 @@ def collect_filtering_parameters(request):
 
 
 def log_special_offer_product_view(user, special_offer, products):
-    print(user, special_offer, products)
+    # Buffered and written from a background thread - see view_log.py
+    record_special_offer_view(user, special_offer, products)
@@ -4,6 +4,7 @@ from . import views
 
 urlpatterns = [
     path('products/<slug:slug>/', views.product_detail, name='product_detail'),
+    path('products-cached/<slug:slug>/', views.product_detail_cached, name='product_detail_cached'),
 ]
 
 app_name = 'detail_view'
@@ -1,8 +1,10 @@
 from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.template.response import TemplateResponse
+from django.views.decorators.http import condition
 
 from shop.models import Product
+from shop.object_cache import get_cached_or_404, product_etag, product_last_modified
 
 
 def product_detail(request, slug):
@@ -20,3 +22,14 @@ def product_detail_longer(request, slug):
     return TemplateResponse(request, 'shop/product_detail.html', {
         'product': product,
     })
+
+
+# Aside, not part of the pattern: the same view with products cached, where
+# clients that already have the current version of the page get a 304. It's
+# still a function returning a TemplateResponse - the extras are a decorator
+# and a different shortcut. See shop/object_cache.py, including its limits.
+@condition(etag_func=product_etag, last_modified_func=product_last_modified)
+def product_detail_cached(request, slug):
+    return TemplateResponse(request, 'shop/product_detail.html', {
+        'product': get_cached_or_404(Product, slug),
+    })
@@ -0,0 +1,353 @@
+# A faster URL resolver for big urlconfs.
+#
+# Django's resolver tries every pattern in order until one matches, so
+# resolving a URL near the end of a long urlconf means running hundreds (or
+# thousands) of regexes. Here we flatten the urlconf (using the same traversal
+# as url_checker) and build a trie keyed on path segments. Static segments are
+# a dict lookup, and segments containing converters (`<int:pk>` etc.) are
+# tried by regex, so finding the handful of routes that *could* match takes
+# time proportional to the depth of the path, not the number of routes.
+#
+# We then check those candidates in urlconf order, using the patterns' own
+# `match()` methods and combining the results the way `URLResolver.resolve()`
+# does, so we get the same answer as Django. Anything we can't put in the trie
+# (regex patterns, converters that could match a '/', resolvers with their own
+# `resolve()` method) is attached at the deepest point we could get to, and
+# checked whenever a path gets that far.
+#
+# For paths that don't match anything we hand over to Django's resolver, so
+# that 404 pages still list the patterns that were tried. (For paths that do
+# match, `ResolverMatch.tried` is not filled in.)
+#
+# Enabled with the TRIE_URL_RESOLVER setting - see wsgi.py and asgi.py.
+
+import functools
+import re
+
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import URLPattern, URLResolver, get_resolver, set_urlconf
+from django.urls.converters import get_converter
+from django.urls.exceptions import Resolver404
+from django.urls.resolvers import ResolverMatch, RoutePattern
+
+from .url_checker import walk_routes
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+
+class TrieNode:
+    __slots__ = ['static', 'dynamic', 'endpoints', 'prefixes']
+
+    def __init__(self):
+        # {segment: TrieNode}
+        self.static = {}
+        # [(compiled segment regex, TrieNode)]
+        self.dynamic = []
+        # Routes that can only match if the path ends here.
+        self.endpoints = []
+        # Routes that might match anything from here on.
+        self.prefixes = []
+
+    def child(self, segment, *, dynamic):
+        if not dynamic:
+            return self.static.setdefault(segment, TrieNode())
+        for regex, node in self.dynamic:
+            if regex.pattern == segment:
+                return node
+        node = TrieNode()
+        self.dynamic.append((re.compile(segment), node))
+        return node
+
+
+class Route:
+    __slots__ = ['order', 'resolvers', 'pattern']
+
+    def __init__(self, order, resolvers, pattern):
+        self.order = order
+        # The URLResolvers that lead to `pattern`, starting with the root.
+        self.resolvers = resolvers
+        # A URLPattern, or a URLResolver that we have to leave to resolve itself.
+        self.pattern = pattern
+
+
+class TrieResolver:
+    def __init__(self, resolver):
+        self.resolver = resolver
+        self.root = TrieNode()
+        self.routes = list(get_trie_routes(resolver))
+        for route in self.routes:
+            self.add(route)
+
+    def add(self, route):
+        segments, complete = route_segments(route)
+        node = self.root
+        for segment, dynamic in segments:
+            node = node.child(segment, dynamic=dynamic)
+        if complete:
+            node.endpoints.append(route)
+        else:
+            node.prefixes.append(route)
+
+    def candidates(self, path):
+        # Everything in the trie that could match `path` (with the root
+        # pattern already stripped), in urlconf order.
+        found = []
+        nodes = [self.root]
+        for segment in path.split('/'):
+            next_nodes = []
+            for node in nodes:
+                found.extend(node.prefixes)
+                child = node.static.get(segment)
+                if child is not None:
+                    next_nodes.append(child)
+                for regex, child in node.dynamic:
+                    if regex.fullmatch(segment):
+                        next_nodes.append(child)
+            nodes = next_nodes
+            if not nodes:
+                break
+        else:
+            for node in nodes:
+                found.extend(node.prefixes)
+                found.extend(node.endpoints)
+        found.sort(key=lambda route: route.order)
+        return found
+
+    def resolve(self, path):
+        path = str(path)
+        match = self.resolver.pattern.match(path)
+        if match:
+            for route in self.candidates(match[0]):
+                resolver_match = match_route(route, path)
+                if resolver_match is not None:
+                    return resolver_match
+        # Let Django produce the Resolver404, with everything it tried.
+        return self.resolver.resolve(path)
+
+
+def get_trie_routes(resolver):
+    order = 0
+    last_opaque = None
+    for parents, pattern in walk_routes(resolver):
+        # A URLResolver subclass with its own `resolve()` could do anything, so
+        # becomes a single route. Everything inside it comes out of
+        # walk_routes together.
+        for i, parent in enumerate(parents):
+            if type(parent).resolve is not URLResolver.resolve:
+                parents, pattern = parents[:i], parent
+                break
+        if pattern is last_opaque:
+            continue
+        if isinstance(pattern, URLResolver):
+            last_opaque = pattern
+        yield Route(order, (resolver,) + parents, pattern)
+        order += 1
+
+
+def route_segments(route):
+    # Returns a list of (segment, dynamic) pairs for the path segments that
+    # `route` must match, and whether that is the whole path.
+    patterns = [resolver.pattern for resolver in route.resolvers[1:]] + [route.pattern.pattern]
+    complete = isinstance(route.pattern, URLPattern)
+    parts = []
+    for pattern in patterns:
+        if not isinstance(pattern, RoutePattern):
+            complete = False
+            break
+        parts.append(str(pattern))
+    if not complete:
+        # Whatever comes after the last '/' could be the start of a segment
+        # that continues in the part we couldn't handle.
+        path = ''.join(parts)
+        parts = [path[:path.rfind('/') + 1]]
+
+    segments = []
+    for segment in ''.join(parts).split('/'):
+        regex = segment_regex(segment)
+        if regex is None:
+            return segments, False
+        segments.append(regex)
+    if not complete:
+        segments.pop()  # The empty string after the last '/'
+    return segments, complete
+
+
+_PARAMETER_RE = re.compile(r'<(?:(?P<converter>[^>:]+):)?(?P<parameter>[^>]+)>')
+
+
+def segment_regex(segment):
+    # Returns (segment, False) for a plain string, (regex, True) for a segment
+    # with converters in, or None if we can't tell where the segment ends.
+    if '<' not in segment:
+        return segment, False
+    regex = []
+    position = 0
+    for match in _PARAMETER_RE.finditer(segment):
+        try:
+            converter = get_converter(match['converter'] or 'str')
+        except KeyError:
+            return None
+        if not excludes_slash(converter.regex):
+            return None
+        regex.append(re.escape(segment[position:match.start()]))
+        regex.append(f'(?:{converter.regex})')
+        position = match.end()
+    regex.append(re.escape(segment[position:]))
+    return ''.join(regex), True
+
+
+@functools.lru_cache(maxsize=None)
+def excludes_slash(regex):
+    # True if `regex` can't match anything containing '/'. Errs on the side of
+    # False for anything unusual.
+    try:
+        return _tokens_exclude_slash(sre_parse.parse(regex))
+    except Exception:
+        return False
+
+
+SLASH = ord('/')
+
+
+def _tokens_exclude_slash(tokens):
+    for op, arg in tokens:
+        op = str(op)
+        if op == 'LITERAL':
+            if arg == SLASH:
+                return False
+        elif op == 'NOT_LITERAL':
+            if arg != SLASH:
+                return False
+        elif op == 'IN':
+            if not _set_excludes_slash(arg):
+                return False
+        elif op in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT'):
+            if not _tokens_exclude_slash(arg[2]):
+                return False
+        elif op in ('SUBPATTERN', 'ATOMIC_GROUP'):
+            if not _tokens_exclude_slash(arg[-1]):
+                return False
+        elif op == 'BRANCH':
+            if not all(_tokens_exclude_slash(branch) for branch in arg[1]):
+                return False
+        elif op != 'AT':
+            return False
+    return True
+
+
+def _set_excludes_slash(items):
+    negated = False
+    contains_slash = False
+    for op, arg in items:
+        op = str(op)
+        if op == 'NEGATE':
+            negated = True
+        elif op == 'LITERAL':
+            contains_slash |= arg == SLASH
+        elif op == 'RANGE':
+            contains_slash |= arg[0] <= SLASH <= arg[1]
+        elif op == 'CATEGORY' and str(arg) in ('CATEGORY_DIGIT', 'CATEGORY_WORD', 'CATEGORY_SPACE'):
+            pass
+        else:
+            contains_slash = True
+    return contains_slash if negated else not contains_slash
+
+
+def match_route(route, path):
+    # Does what the chain of URLResolver.resolve() calls would do for this one
+    # route, returning a ResolverMatch or None.
+    levels = []
+    for resolver in route.resolvers:
+        match = resolver.pattern.match(path)
+        if not match:
+            return None
+        path, args, kwargs = match
+        levels.append((resolver, args, kwargs))
+    try:
+        sub_match = route.pattern.resolve(path)
+    except Resolver404:
+        return None
+    if not sub_match:
+        return None
+
+    args, kwargs = sub_match.args, sub_match.kwargs
+    app_names, namespaces, sub_route = sub_match.app_names, sub_match.namespaces, sub_match.route
+    child = route.pattern
+    for resolver, resolver_args, resolver_kwargs in reversed(levels):
+        sub_match_dict = {**resolver_kwargs, **resolver.default_kwargs}
+        sub_match_dict.update(kwargs)
+        # If there are *any* named groups, ignore all non-named groups.
+        if not sub_match_dict:
+            args = resolver_args + args
+        kwargs = sub_match_dict
+        current_route = '' if isinstance(child, URLPattern) else str(child.pattern)
+        sub_route = resolver._join_route(current_route, sub_route)
+        app_names = [resolver.app_name] + app_names
+        namespaces = [resolver.namespace] + namespaces
+        child = resolver
+    return ResolverMatch(sub_match.func, args, kwargs, sub_match.url_name, app_names, namespaces, sub_route)
+
+
+def get_trie_resolver(urlconf=None):
+    if urlconf is None:
+        urlconf = settings.ROOT_URLCONF
+    return _get_cached_trie_resolver(urlconf)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_cached_trie_resolver(urlconf):
+    return TrieResolver(get_resolver(urlconf))
+
+
+@receiver(setting_changed)
+def clear_trie_resolvers(setting, **kwargs):
+    if setting == 'ROOT_URLCONF':
+        _get_cached_trie_resolver.cache_clear()
+
+
+# Handlers
+
+class TrieResolverMixin:
+    # For use with Django's request handler classes.
+    def resolve_request(self, request):
+        if hasattr(request, 'urlconf'):
+            urlconf = request.urlconf
+            set_urlconf(urlconf)
+        else:
+            urlconf = None
+        resolver_match = get_trie_resolver(urlconf).resolve(request.path_info)
+        request.resolver_match = resolver_match
+        return resolver_match
+
+
+class TrieWSGIHandler(TrieResolverMixin, WSGIHandler):
+    pass
+
+
+class TrieASGIHandler(TrieResolverMixin, ASGIHandler):
+    pass
+
+
+# Replacements for django.core.wsgi.get_wsgi_application and
+# django.core.asgi.get_asgi_application that respect TRIE_URL_RESOLVER.
+
+def get_wsgi_application():
+    django.setup(set_prefix=False)
+    if getattr(settings, 'TRIE_URL_RESOLVER', False):
+        return TrieWSGIHandler()
+    return WSGIHandler()
+
+
+def get_asgi_application():
+    django.setup(set_prefix=False)
+    if getattr(settings, 'TRIE_URL_RESOLVER', False):
+        return TrieASGIHandler()
+    return ASGIHandler()
@@ -0,0 +1,174 @@
+# A faster reverse() for URLs built in loops, e.g. a link for every row of a
+# product list.
+#
+# Every call to `reverse()` walks the namespaces in the view name, looks up
+# the possible patterns, and checks the result against the pattern's regex.
+# The first two steps give the same answer every time for a given view name,
+# so we do them once, and remember the candidate patterns. After that,
+# building a URL is a converter `to_url()` call, a string format, and the
+# regex check.
+#
+# If none of the compiled candidates fit the arguments, we hand over to
+# `reverse()`, which either finds something we missed or raises the usual
+# NoReverseMatch.
+
+import re
+import threading
+from urllib.parse import quote
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import NoReverseMatch, get_resolver, get_script_prefix, get_urlconf, reverse
+from django.urls.resolvers import get_ns_resolver
+from django.utils.http import RFC3986_SUBDELIMS, escape_leading_slashes
+from django.utils.translation import get_language
+
+SAFE_CHARS = RFC3986_SUBDELIMS + '/~:@'
+
+
+class CompiledPattern:
+    # One way of building a URL for a view name, from the resolver's
+    # reverse_dict.
+    __slots__ = ['template', 'params', 'defaults', 'converters', 'regex']
+
+    def __init__(self, prefix, result, params, pattern, defaults, converters):
+        self.template = prefix.replace('%', '%%') + result
+        self.params = params
+        self.defaults = defaults
+        self.converters = converters
+        self.regex = re.compile('^%s%s' % (re.escape(prefix), pattern))
+
+    def format(self, args, kwargs):
+        # Returns the URL, or None if the arguments don't fit. The checks are
+        # the same as URLResolver._reverse_with_prefix()
+        if args:
+            if len(args) != len(self.params):
+                return None
+            subs = dict(zip(self.params, args))
+        else:
+            if set(kwargs).symmetric_difference(self.params).difference(self.defaults):
+                return None
+            if any(kwargs.get(k, v) != v for k, v in self.defaults.items()):
+                return None
+            subs = kwargs
+        text_subs = {}
+        for k, v in subs.items():
+            converter = self.converters.get(k)
+            if converter is None:
+                text_subs[k] = str(v)
+            else:
+                try:
+                    text_subs[k] = converter.to_url(v)
+                except ValueError:
+                    return None
+        url = self.template % text_subs
+        if not self.regex.search(url):
+            return None
+        return escape_leading_slashes(quote(url, safe=SAFE_CHARS))
+
+
+class CompiledReverse:
+    # All the ways of building URLs for a view name, callable like reverse()
+    # but without the view name.
+    def __init__(self, viewname, urlconf, current_app, prefix):
+        self.viewname = viewname
+        self.urlconf = urlconf
+        self.current_app = current_app
+        self.patterns = compile_reverse(viewname, urlconf, current_app, prefix)
+
+    def __call__(self, args=None, kwargs=None):
+        args = args or []
+        kwargs = kwargs or {}
+        if not (args and kwargs):
+            for pattern in self.patterns:
+                url = pattern.format(args, kwargs)
+                if url is not None:
+                    return url
+        return reverse(self.viewname, self.urlconf, args, kwargs, self.current_app)
+
+
+_compiled = {}
+_lock = threading.Lock()
+
+
+def get_compiled_reverse(viewname, urlconf=None, current_app=None):
+    # Looking up the urlconf and script prefix for the current request isn't
+    # free, so code that builds lots of URLs for the same view in one go can
+    # call this once and then use what it returns.
+    if urlconf is None:
+        urlconf = get_urlconf()
+    prefix = get_script_prefix()
+    key = (viewname, urlconf, current_app, prefix, get_language())
+    compiled = _compiled.get(key)
+    if compiled is None:
+        compiled = CompiledReverse(viewname, urlconf, current_app, prefix)
+        with _lock:
+            _compiled[key] = compiled
+    return compiled
+
+
+def fast_reverse(viewname, urlconf=None, args=None, kwargs=None, current_app=None):
+    # Same signature and results as django.urls.reverse
+    return get_compiled_reverse(viewname, urlconf, current_app)(args, kwargs)
+
+
+def compile_reverse(viewname, urlconf, current_app, prefix):
+    # The namespace handling here is copied from django.urls.reverse
+    resolver = get_resolver(urlconf)
+    if not isinstance(viewname, str):
+        view = viewname
+    else:
+        *path, view = viewname.split(':')
+
+        if current_app:
+            current_path = current_app.split(':')
+            current_path.reverse()
+        else:
+            current_path = None
+
+        resolved_path = []
+        ns_pattern = ''
+        ns_converters = {}
+        for ns in path:
+            current_ns = current_path.pop() if current_path else None
+            # Lookup the name to see if it could be an app identifier.
+            try:
+                app_list = resolver.app_dict[ns]
+                if current_ns and current_ns in app_list:
+                    ns = current_ns
+                elif ns not in app_list:
+                    ns = app_list[0]
+            except KeyError:
+                pass
+
+            if ns != current_ns:
+                current_path = None
+
+            try:
+                extra, resolver = resolver.namespace_dict[ns]
+                resolved_path.append(ns)
+                ns_pattern = ns_pattern + extra
+                ns_converters.update(resolver.pattern.converters)
+            except KeyError as key:
+                if resolved_path:
+                    raise NoReverseMatch(
+                        "%s is not a registered namespace inside '%s'" %
+                        (key, ':'.join(resolved_path))
+                    )
+                else:
+                    raise NoReverseMatch("%s is not a registered namespace" % key)
+        if ns_pattern:
+            resolver = get_ns_resolver(ns_pattern, resolver, tuple(ns_converters.items()))
+
+    return [
+        CompiledPattern(prefix, result, params, pattern, defaults, converters)
+        for possibility, pattern, defaults, converters in resolver.reverse_dict.getlist(view)
+        for result, params in possibility
+    ]
+
+
+@receiver(setting_changed)
+def clear_compiled(setting, **kwargs):
+    if setting == 'ROOT_URLCONF':
+        with _lock:
+            _compiled.clear()
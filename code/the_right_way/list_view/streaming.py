@@ -0,0 +1,39 @@
+# Streaming a long list page, instead of building it all in memory first.
+#
+# We render the page template once, with a marker where the rows go, and send
+# everything before the marker straight away. Then rows are rendered and sent a
+# chunk at a time, as they come out of the database, followed by the rest of
+# the page. Memory use depends on the chunk size, not the length of the list.
+#
+# This is for WSGI only. Under ASGI, Django 3.2 iterates streaming responses
+# synchronously in the event loop, where the ORM can't run, and anything that
+# waited there for rows from another thread would hold up every other request.
+# So under ASGI we build the whole page in the view's thread and send it in one
+# go, as a normal response.
+
+import itertools
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+ROWS_MARKER = '<!-- rows -->'
+
+
+def streaming_list_response(request, template_name, context, *, rows, rows_template_name,
+                            rows_context_name='products', chunk_size=100):
+    page = render_to_string(template_name, context | {'rows': mark_safe(ROWS_MARKER)}, request=request)
+    head, tail = page.split(ROWS_MARKER, 1)
+    rows_template = get_template(rows_template_name)
+
+    def content():
+        yield head
+        iterator = iter(rows)
+        while chunk := list(itertools.islice(iterator, chunk_size)):
+            yield rows_template.render({rows_context_name: chunk})
+        yield tail
+
+    if isinstance(request, ASGIRequest):
+        return HttpResponse(''.join(content()))
+    return StreamingHttpResponse(content(), content_type='text/html; charset=utf-8')
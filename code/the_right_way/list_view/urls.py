@@ -4,6 +4,9 @@ from . import views
 
 urlpatterns = [
     path('products-unpaged/', views.product_list_unpaged, name='product_list_unpaged'),
+    path('products-streamed/', views.product_list_streamed, name='product_list_streamed'),
+    path('special-offers-streamed/<slug:slug>/', views.special_offer_detail_streamed,
+         name='special_offer_detail_streamed'),
     path('products/', views.product_list, name='product_list'),
     path('products-refactored/', views.product_list_refactored, name='product_list_refactored'),
 ]
@@ -1,7 +1,10 @@
 from django.core.paginator import Paginator
+from django.shortcuts import get_object_or_404
 from django.template.response import TemplateResponse
 
-from shop.models import Product
+from shop.models import Product, SpecialOffer
+
+from .streaming import streaming_list_response
 
 
 def product_list_unpaged(request):
@@ -10,6 +13,30 @@ def product_list_unpaged(request):
     })
 
 
+def product_list_streamed(request):
+    # Like product_list_unpaged, but the response is sent as the rows are
+    # fetched - see streaming.py
+    return streaming_list_response(
+        request,
+        'shop/product_list_streamed.html',
+        {},
+        rows=Product.objects.all().iterator(chunk_size=500),
+        rows_template_name='shop/includes/product_rows.html',
+    )
+
+
+def special_offer_detail_streamed(request, slug):
+    # Streamed, like product_list_streamed
+    special_offer = get_object_or_404(SpecialOffer.objects.all(), slug=slug)
+    return streaming_list_response(
+        request,
+        'shop/special_offer_detail_streamed.html',
+        {'special_offer': special_offer},
+        rows=special_offer.get_products().iterator(chunk_size=500),
+        rows_template_name='shop/includes/product_rows.html',
+    )
+
+
 def product_list(request):
     products = Product.objects.all()
     paginator = Paginator(products, 5)  # Show 25 products per page.
@@ -28,7 +55,10 @@ def product_list_refactored(request):
     return TemplateResponse(request, 'shop/product_list.html', context)
 
 
-def paged_object_list_context(request, products, *, paginate_by):
+def paged_object_list_context(request, products, *, paginate_by, projection=None):
+    # See shop/projections.py for `projection`
+    if projection is not None:
+        products = projection(products)
     paginator = Paginator(products, paginate_by)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
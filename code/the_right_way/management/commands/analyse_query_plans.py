@@ -0,0 +1,214 @@
+import logging
+import re
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import get_resolver
+
+from the_right_way.benchmarking import benchmark_database, seed_site
+from the_right_way.route_samples import all_sample_paths
+
+# Query strings to try on every route, so that search views actually search.
+QUERY_STRINGS = ['', 'q=wool&color=re']
+
+_ORDER_BY_RE = re.compile(r'\bORDER BY (.+?)(?:\bLIMIT\b|\bOFFSET\b|$)', re.S)
+_COLUMN_RE = re.compile(r'"(\w+)"\."(\w+)"')
+# Conditions comparing a column with a parameter, not with another column.
+_CONDITION_RE = re.compile(r'"(\w+)"\."(\w+)"\s*(=|IN\b|LIKE\b|>=|<=|>|<)\s*\(?%s')
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many:
+            self.queries.append((sql, tuple(params) if params is not None else None))
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = ("Requests every route on a throwaway database, runs EXPLAIN QUERY PLAN on the SQL each view "
+            "issues, and reports full table scans and temporary B-trees, with suggested indexes")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=5000)
+        parser.add_argument('--min-rows', type=int, default=100,
+                            help="Don't complain about scans of tables smaller than this")
+        parser.add_argument('--include-admin', action='store_true')
+        parser.add_argument('--verbose-plans', action='store_true', help="Show plans for every query")
+
+    def handle(self, *args, products, min_rows, include_admin, verbose_plans, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Only SQLite query plans are supported')
+        self.min_rows = min_rows
+        self.verbose_plans = verbose_plans
+        self.suggestions = defaultdict(set)
+
+        # Without caches, every view does all its queries every time.
+        dummy_caches = {alias: {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'} for alias in settings.CACHES}
+        with benchmark_database(), override_settings(CACHES=dummy_caches, ALLOWED_HOSTS=['testserver']):
+            user = seed_site(products)
+            self.table_sizes = self.get_table_sizes()
+            client = Client()
+            # 404s are expected while we look for sample URLs that work.
+            logging.getLogger('django.request').setLevel(logging.ERROR)
+            client.force_login(user)
+            for route, paths in all_sample_paths(get_resolver()):
+                if route.startswith('admin/') and not include_admin:
+                    continue
+                if not paths:
+                    self.stdout.write(f'{route}: skipped, no sample URL')
+                    continue
+                self.analyse_route(client, route, paths)
+
+        if self.suggestions:
+            self.stdout.write('\nSuggestions:')
+            for suggestion, routes in sorted(self.suggestions.items()):
+                self.stdout.write(f'  {suggestion}')
+                self.stdout.write(f'      (from {len(routes)} route(s), e.g. {sorted(routes)[0]})')
+
+    def get_table_sizes(self):
+        sizes = {}
+        with connection.cursor() as cursor:
+            for table in connection.introspection.table_names(cursor):
+                cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+                sizes[table] = cursor.fetchone()[0]
+        return sizes
+
+    def analyse_route(self, client, route, paths):
+        previous_sql = None
+        for query_string in QUERY_STRINGS:
+            # Take the first sample path the view is happy with.
+            for path in paths:
+                recorder = QueryRecorder()
+                with connection.execute_wrapper(recorder):
+                    response = client.get(path, QUERY_STRING=query_string)
+                    if hasattr(response, 'streaming_content'):
+                        b''.join(response.streaming_content)
+                if response.status_code != 404:
+                    break
+            # Most views ignore the query string, and there's no need to say
+            # everything twice.
+            sql_issued = [sql for sql, params in recorder.queries]
+            if sql_issued == previous_sql:
+                continue
+            previous_sql = sql_issued
+
+            url = f'{path}?{query_string}' if query_string else path
+            problems = []
+            seen = set()
+            for sql, params in recorder.queries:
+                if sql in seen or not sql.lstrip().upper().startswith('SELECT') or 'sqlite_master' in sql:
+                    continue
+                seen.add(sql)
+                plan = self.explain(sql, params)
+                flags = self.flag(sql, plan)
+                if flags or self.verbose_plans:
+                    problems.append((sql, plan, flags))
+                for flag in flags:
+                    suggestion = self.suggest(sql, flag)
+                    if suggestion:
+                        self.suggestions[suggestion].add(route)
+
+            status = f'{url} -> {response.status_code}, {len(recorder.queries)} queries'
+            self.stdout.write(status + (f', {sum(bool(p[2]) for p in problems)} flagged' if problems else ''))
+            for sql, plan, flags in problems:
+                self.stdout.write(f'    {sql[:200]}')
+                for detail in plan:
+                    marker = '!!' if detail in {f[1] for f in flags} else '  '
+                    self.stdout.write(f'      {marker} {detail}')
+
+    def explain(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def flag(self, sql, plan):
+        # Returns [(kind, plan line, table)]
+        flags = []
+        # A scan with nothing to filter or sort stops after LIMIT rows.
+        stops_early = ' LIMIT ' in sql and ' WHERE ' not in sql and ' ORDER BY ' not in sql
+        for detail in plan:
+            match = re.match(r'SCAN (\w+)(?: AS \w+)?$', detail)
+            if match and self.table_sizes.get(match[1], 0) >= self.min_rows and not stops_early:
+                flags.append(('scan', detail, match[1]))
+            elif detail.startswith('USE TEMP B-TREE'):
+                flags.append(('temp-b-tree', detail, None))
+        return flags
+
+    def suggest(self, sql, flag):
+        kind, detail, table = flag
+        if kind == 'scan':
+            conditions = [(column, op) for t, column, op in _CONDITION_RE.findall(sql) if t == table]
+            if any(op == 'LIKE' for column, op in conditions):
+                like_columns = sorted({column for column, op in conditions if op == 'LIKE'})
+                return (f'{self.describe_table(table)}: substring matching on {", ".join(like_columns)} '
+                        f"can't use an index - consider full-text search (see dependency_injection/fts_search.py)")
+            columns = _dedupe(column for column, op in conditions if op != 'LIKE')
+            if columns:
+                return self.index_suggestion(table, columns)
+            return f'{self.describe_table(table)}: every row is read - does this view need a filter or a LIMIT?'
+
+        # temp-b-tree
+        order_by = _ORDER_BY_RE.search(sql)
+        if not order_by or 'ORDER BY' not in detail:
+            return None
+        order_columns = _COLUMN_RE.findall(order_by[1])
+        if not order_columns:
+            return None
+        table = order_columns[0][0]
+        columns = _dedupe(column for t, column in order_columns if t == table)
+        equality = _dedupe(column for t, column, op in _CONDITION_RE.findall(sql) if t == table and op == '=')
+        return self.index_suggestion(table, equality + [c for c in columns if c not in equality], sort=True)
+
+    def index_suggestion(self, table, columns, *, sort=False):
+        model = _model_for_table(table)
+        fields = [_field_name(model, column) for column in columns]
+        existing = self.existing_index(table, columns)
+        what = 'sorting' if sort else 'filtering'
+        if existing:
+            return (f'{self.describe_table(table)}: {what} on {", ".join(fields)} is not using the existing '
+                    f'index {existing} - probably because of the join order, so an index on this table alone '
+                    f'will not help')
+        target = model._meta.label if model else table
+        return f'{target}: add models.Index(fields={fields!r}) for {what}'
+
+    def existing_index(self, table, columns):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, table)
+        for name, info in constraints.items():
+            if (info['index'] or info['unique']) and info['columns'][:len(columns)] == columns:
+                return name
+        return None
+
+    def describe_table(self, table):
+        model = _model_for_table(table)
+        return f'{model._meta.label if model else table} ({self.table_sizes.get(table, 0):,} rows)'
+
+
+def _dedupe(items):
+    result = []
+    for item in items:
+        if item not in result:
+            result.append(item)
+    return result
+
+
+def _model_for_table(table):
+    for model in apps.get_models(include_auto_created=True):
+        if model._meta.db_table == table:
+            return model
+    return None
+
+
+def _field_name(model, column):
+    if model is not None:
+        for field in model._meta.concrete_fields:
+            if field.column == column:
+                return field.name
+    return column
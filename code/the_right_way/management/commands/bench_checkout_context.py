@@ -0,0 +1,57 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from accounts.models import Address, User
+from the_right_way.benchmarking import benchmark_database, median_ms, time_calls
+from the_right_way.common_context_data.views import checkout_pages_context_data
+
+
+def uncached_context_data(user):
+    # What checkout_pages_context_data did before addresses were cached.
+    return {'user_addresses': list(user.addresses.order_by('primary', 'first_line'))}
+
+
+class Command(BaseCommand):
+    help = "Times building the checkout pages context for users with many addresses, on a throwaway database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--addresses', type=int, nargs='+', default=[10, 100, 1000])
+        parser.add_argument('--other-users', type=int, default=1000,
+                            help="Other users, each with 50 addresses, so that the table isn't tiny")
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, addresses, other_users, repeat, **options):
+        with benchmark_database():
+            self.seed_other_users(other_users)
+            query = str(User(pk=1).addresses.order_by('primary', 'first_line').query)
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+                cursor.execute(f'EXPLAIN QUERY PLAN {query}')
+                self.stdout.write('Plan: ' + '; '.join(row[-1] for row in cursor.fetchall()))
+
+            self.stdout.write(f'{"addresses":>10} {"query ms":>10} {"cached ms":>10}')
+            for count in addresses:
+                user = User.objects.create(username=f'bench-{count}')
+                Address.objects.bulk_create([
+                    Address(user=user, first_line=f'{i} High Street', post_code='AB1 2CD',
+                            short_name=f'Address {i}', primary=(i == 0))
+                    for i in range(count)
+                ])
+                query_ms = median_ms(time_calls(lambda: uncached_context_data(user), repeat=repeat))
+                checkout_pages_context_data(user)  # Fill the cache
+                cached_ms = median_ms(time_calls(lambda: checkout_pages_context_data(user), repeat=repeat))
+                self.stdout.write(f'{count:>10,} {query_ms:>10.3f} {cached_ms:>10.3f}')
+        cache.clear()
+
+    def seed_other_users(self, count):
+        users = User.objects.bulk_create([User(username=f'other-{i}') for i in range(count)])
+        if connection.features.can_return_rows_from_bulk_insert:
+            user_ids = [user.pk for user in users]
+        else:
+            user_ids = list(User.objects.filter(username__startswith='other-').values_list('pk', flat=True))
+        Address.objects.bulk_create([
+            Address(user_id=user_id, first_line=f'{i} Other Road', post_code='XY9 8ZW', short_name=f'Other {i}')
+            for user_id in user_ids
+            for i in range(50)
+        ], batch_size=5000)
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.template import engines
+from django.urls import reverse
+
+from the_right_way.benchmarking import median_ms, time_calls
+from the_right_way.fast_reverse import fast_reverse, get_compiled_reverse
+
+ROWS = '<p><a href="{%% %s "detail_view:product_detail" slug=product.slug %%}">{{ product.name }}</a></p>'
+TEMPLATE = '{%% load fast_urls %%}{%% for product in products %%}%s{%% endfor %%}'
+
+
+class Command(BaseCommand):
+    help = "Compares {% url %} with {% fast_url %} rendering a page of product rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, rows, repeat, **options):
+        products = [{'name': f'Product {i}', 'slug': f'product-{i}'} for i in range(rows)]
+        engine = engines['django']
+        url_template = engine.from_string(TEMPLATE % (ROWS % 'url'))
+        fast_url_template = engine.from_string(TEMPLATE % (ROWS % 'fast_url'))
+        context = {'products': products}
+        assert url_template.render(context) == fast_url_template.render(context)
+
+        self.stdout.write(f'Rendering {rows:,} rows:')
+        for name, template in [('{% url %}', url_template), ('{% fast_url %}', fast_url_template)]:
+            ms = median_ms(time_calls(lambda: template.render(context), repeat=repeat))
+            self.stdout.write(f'  {name:<16} {ms:>8.2f}ms')
+
+        self.stdout.write(f'{rows:,} calls:')
+        compiled = get_compiled_reverse('detail_view:product_detail')
+        for name, func in [
+            ('reverse', lambda slug: reverse('detail_view:product_detail', kwargs={'slug': slug})),
+            ('fast_reverse', lambda slug: fast_reverse('detail_view:product_detail', kwargs={'slug': slug})),
+            ('compiled', lambda slug: compiled(kwargs={'slug': slug})),
+        ]:
+            ms = median_ms(time_calls(lambda: [func(p['slug']) for p in products], repeat=repeat))
+            self.stdout.write(f'  {name:<16} {ms:>8.2f}ms')
@@ -0,0 +1,47 @@
+from django.contrib.auth.decorators import login_required
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.utils.functional import SimpleLazyObject
+
+from accounts.models import User
+from the_right_way.benchmarking import median_ms, time_calls
+from the_right_way.policies import decorators as policy_decorators
+from the_right_way.policies.decorators import AUTHENTICATED, PREMIUM, policy
+from the_right_way.preconditions.views import premium_required
+
+
+def view(request):
+    return HttpResponse()
+
+
+class Command(BaseCommand):
+    help = "Compares the per-request overhead of stacked precondition decorators with policy()"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, calls, repeat, **options):
+        variants = [
+            ('undecorated', view),
+            # What preconditions.views.my_premium_page ends up as when
+            # included with decorator_include, as in policies/urls.py
+            ('stacked', policy_decorators.premium_required(login_required(premium_required(view)))),
+            ('policy()', policy(AUTHENTICATED, PREMIUM)(view)),
+        ]
+        user = User(username='bench', is_premium=True)
+        request = RequestFactory().get('/')
+
+        self.stdout.write(f'{"":<12} {"µs/request":>12} {"overhead":>10}')
+        baseline = None
+        for name, func in variants:
+            def run():
+                for _ in range(calls):
+                    # As AuthenticationMiddleware does it.
+                    request.user = SimpleLazyObject(lambda: user)
+                    func(request)
+            us = median_ms(time_calls(run, repeat=repeat)) * 1000 / calls
+            if baseline is None:
+                baseline = us
+            self.stdout.write(f'{name:<12} {us:>12.2f} {us - baseline:>10.2f}')
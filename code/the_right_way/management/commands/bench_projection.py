@@ -0,0 +1,49 @@
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from shop.models import Product
+from shop.projections import LIST_FIELDS, only, product_list_rows, values
+from the_right_way.benchmarking import benchmark_database, median_ms, seed_products, time_calls
+from the_right_way.delegation.views import cached_count_paged_object_list_context
+
+PROJECTIONS = {
+    'none (full rows)': None,
+    'only()': only(*LIST_FIELDS),
+    'values()': values(*LIST_FIELDS),
+    'rows': product_list_rows,
+}
+
+
+class Command(BaseCommand):
+    help = "Compares time and memory per page of product list for different projections, on a throwaway database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=20_000)
+        parser.add_argument('--description-words', type=int, default=500)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--page', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, products, description_words, page_size, page, repeat, **options):
+        request = RequestFactory().get('/', {'page': page})
+        with benchmark_database():
+            seed_products(products, description_words=description_words)
+
+            self.stdout.write(f'{products:,} products, ~{description_words} word descriptions, '
+                              f'page {page} of {page_size}')
+            self.stdout.write(f'{"projection":<20} {"ms/page":>10} {"peak KiB":>10}')
+            for name, projection in PROJECTIONS.items():
+                def render_page():
+                    context = cached_count_paged_object_list_context(
+                        request, Product.objects.order_by('name'), paginate_by=page_size, projection=projection)
+                    return list(context['page_obj'])
+
+                render_page()  # warm up, including the cached count
+                timings = time_calls(render_page, repeat=repeat)
+                tracemalloc.start()
+                render_page()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                self.stdout.write(f'{name:<20} {median_ms(timings):>10.2f} {peak / 1024:>10.1f}')
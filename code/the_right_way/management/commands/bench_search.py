@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from the_right_way.benchmarking import benchmark_database, median_ms, seed_products, time_calls
+from the_right_way.dependency_injection.search import Filter, product_search
+from the_right_way.dependency_injection.trigram_search import product_index, trigram_product_search
+
+QUERIES = [
+    {},
+    {Filter.NAME: 'wool'},
+    {Filter.NAME: 'hat'},
+    {Filter.NAME: 'sturdy boots'},
+    {Filter.NAME: '12'},
+    {Filter.COLOR: 'blue'},
+    {Filter.NAME: 'shirt', Filter.COLOR: 're'},
+]
+
+
+class Command(BaseCommand):
+    help = "Compares QuerySet product search with the in-memory trigram index, on a throwaway database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, sizes, repeat, **options):
+        try:
+            with benchmark_database():
+                for size in sorted(sizes):
+                    seed_products(size)
+                    start = time.perf_counter()
+                    product_index.build()
+                    self.stdout.write(f'\n{size:,} products, index built in {time.perf_counter() - start:.2f}s')
+                    self.stdout.write(f'{"filters":<40} {"QuerySet ms":>12} {"trigram ms":>12}')
+                    for filters in QUERIES:
+                        queryset_ms = median_ms(time_calls(lambda: product_search(filters, page=2), repeat=repeat))
+                        trigram_ms = median_ms(time_calls(lambda: trigram_product_search(filters, page=2),
+                                                          repeat=repeat))
+                        self.stdout.write(f'{str(filters):<40} {queryset_ms:>12.2f} {trigram_ms:>12.2f}')
+        finally:
+            # Don't leave an index of the throwaway database around.
+            product_index.clear()
@@ -0,0 +1,114 @@
+import random
+import sys
+import time
+import types
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpResponse
+from django.urls import Resolver404, clear_url_caches, get_resolver, include, path, re_path
+
+from the_right_way.benchmarking import median_ms, time_calls
+from the_right_way.fast_resolver import TrieResolver
+
+URLCONF = 'the_right_way_bench_urls'
+
+
+def view(request, **kwargs):
+    return HttpResponse()
+
+
+def make_urlconf(sections, per_section):
+    # `sections` includes of `per_section` routes each, a mixture of static
+    # routes, routes with converters, and a few regex routes at the end of
+    # every section that the trie can't do anything clever with.
+    urlpatterns = []
+    for i in range(sections):
+        patterns = []
+        for j in range(per_section):
+            kind = j % 4
+            if kind == 0:
+                patterns.append(path(f'page-{j}/', view, name=f'page-{j}'))
+            elif kind == 1:
+                patterns.append(path(f'item-{j}/<int:pk>/', view, name=f'item-{j}'))
+            elif kind == 2:
+                patterns.append(path(f'tag-{j}/<slug:slug>/edit/', view, name=f'tag-{j}'))
+            else:
+                patterns.append(path(f'archive-{j}/<int:year>-<int:month>/', view, name=f'archive-{j}'))
+        patterns.append(re_path(r'^legacy/(?P<code>[A-Z]+)/$', view, name='legacy'))
+        urlpatterns.append(path(f'section-{i}/', include((patterns, f'section-{i}'))))
+    module = types.ModuleType(URLCONF)
+    module.urlpatterns = urlpatterns
+    return module
+
+
+def sample_paths(sections, per_section, count, rng):
+    paths = []
+    for _ in range(count):
+        i = rng.randrange(sections)
+        j = rng.randrange(per_section)
+        kind = j % 4
+        if kind == 0:
+            paths.append(f'/section-{i}/page-{j}/')
+        elif kind == 1:
+            paths.append(f'/section-{i}/item-{j}/{rng.randrange(10000)}/')
+        elif kind == 2:
+            paths.append(f'/section-{i}/tag-{j}/some-slug/edit/')
+        else:
+            paths.append(f'/section-{i}/archive-{j}/2020-{rng.randrange(1, 13)}/')
+    # Some that fall through to the regex routes, and some 404s.
+    paths += [f'/section-{rng.randrange(sections)}/legacy/ABC/' for _ in range(count // 20)]
+    return paths
+
+
+def missing_paths(sections, count, rng):
+    return [f'/section-{rng.randrange(sections)}/nothing-here/' for _ in range(count)]
+
+
+def resolve_all(resolver, paths):
+    results = []
+    for p in paths:
+        try:
+            match = resolver.resolve(p)
+        except Resolver404:
+            results.append(None)
+        else:
+            results.append((match.func, match.args, match.kwargs, match.url_name,
+                            match.app_names, match.namespaces, match.route))
+    return results
+
+
+class Command(BaseCommand):
+    help = "Compares Django's URL resolver with the_right_way.fast_resolver on a synthetic urlconf"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sections', type=int, default=100)
+        parser.add_argument('--per-section', type=int, default=100)
+        parser.add_argument('--paths', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, sections, per_section, paths, repeat, **options):
+        sys.modules[URLCONF] = make_urlconf(sections, per_section)
+        try:
+            resolver = get_resolver(URLCONF)
+            start = time.perf_counter()
+            trie = TrieResolver(resolver)
+            build_time = time.perf_counter() - start
+            self.stdout.write(f'{len(trie.routes):,} routes, trie built in {build_time * 1000:.0f}ms')
+
+            rng = random.Random(0)
+            found = sample_paths(sections, per_section, paths, rng)
+            # 404s go to Django's resolver either way, so are timed separately.
+            missing = missing_paths(sections, paths // 10, rng)
+            if resolve_all(resolver, found + missing) != resolve_all(trie, found + missing):
+                raise CommandError('TrieResolver gave different results from Django')
+
+            self.stdout.write(f'{"":<8} {"µs/path":>10} {"µs/404":>10}')
+            for name, r in [('Django', resolver), ('trie', trie)]:
+                found_ms = median_ms(time_calls(lambda: resolve_all(r, found), repeat=repeat))
+                missing_ms = median_ms(time_calls(lambda: resolve_all(r, missing), repeat=repeat))
+                per_path = found_ms * 1000 / len(found)
+                per_404 = missing_ms * 1000 / len(missing)
+                self.stdout.write(f'{name:<8} {per_path:>10.1f} {per_404:>10.1f}')
+        finally:
+            del sys.modules[URLCONF]
+            clear_url_caches()
@@ -0,0 +1,141 @@
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import get_resolver
+
+from the_right_way.benchmarking import benchmark_database, percentile_ms, seed_site
+from the_right_way.route_samples import all_sample_paths, first_working_path, get_response
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = ("Times every route through the test client on a throwaway seeded database, reporting latency "
+            "percentiles, query counts and response sizes, optionally compared with a saved baseline")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=20, help="Timed requests per route")
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed requests per route before timing")
+        parser.add_argument('--routes', nargs='+', default=[], metavar='PREFIX',
+                            help="Only routes starting with one of these")
+        parser.add_argument('--include-admin', action='store_true')
+        parser.add_argument('--no-cache', action='store_true', help="Use a dummy cache for every cache alias")
+        parser.add_argument('--json', dest='json_file', metavar='FILE', help="Save results as JSON")
+        parser.add_argument('--baseline', metavar='FILE', help="JSON from a previous run to compare with")
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help="Fractional slowdown in p50 or p95 to count as a regression")
+        parser.add_argument('--min-ms', type=float, default=0.5,
+                            help="Ignore slowdowns smaller than this, which are usually noise")
+
+    def handle(self, *args, products, requests, warmup, routes, include_admin, no_cache, json_file, baseline,
+               threshold, min_ms, **options):
+        if requests < 1:
+            raise CommandError('--requests must be at least 1')
+        baseline_results = None
+        if baseline:
+            with open(baseline) as f:
+                baseline_results = json.load(f)
+
+        # N+1 detection inspects the stack for every query, which we don't want to time.
+        overrides = {'ALLOWED_HOSTS': ['testserver'], 'NPLUSONE_ACTION': None}
+        if no_cache:
+            overrides['CACHES'] = {alias: {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+                                   for alias in settings.CACHES}
+        with benchmark_database(), override_settings(**overrides):
+            user = seed_site(products)
+            client = Client()
+            client.force_login(user)
+            # 404s are expected while we look for sample URLs that work.
+            logging.getLogger('django.request').setLevel(logging.ERROR)
+            results = {}
+            for route, paths in all_sample_paths(get_resolver()):
+                if route.startswith('admin/') and not include_admin:
+                    continue
+                if routes and not route.startswith(tuple(routes)):
+                    continue
+                path = first_working_path(client, paths)
+                if path is None:
+                    self.stderr.write(f'Skipping {route}, no sample URL')
+                    continue
+                results[route] = self.bench_route(client, path, requests, warmup)
+
+        output = {'products': products, 'requests': requests, 'no_cache': no_cache, 'routes': results}
+        self.write_table(results)
+        if json_file:
+            with open(json_file, 'w') as f:
+                json.dump(output, f, indent=2)
+        if baseline_results is not None:
+            regressions = compare(baseline_results, output, threshold=threshold, min_ms=min_ms)
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(regression))
+            if regressions:
+                raise CommandError(f'{len(regressions)} regression(s) compared with {baseline}')
+            self.stdout.write(self.style.SUCCESS(f'No regressions compared with {baseline}'))
+
+    def bench_route(self, client, path, requests, warmup):
+        for _ in range(warmup):
+            get_response(client, path)
+        timings = []
+        query_counts = []
+        for _ in range(requests):
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                response = get_response(client, path)
+                timings.append(time.perf_counter() - start)
+            query_counts.append(counter.count)
+        return {
+            'path': path,
+            'status': response.status_code,
+            'p50_ms': round(percentile_ms(timings, 50), 3),
+            'p95_ms': round(percentile_ms(timings, 95), 3),
+            'p99_ms': round(percentile_ms(timings, 99), 3),
+            # After warming up this is usually the same every time, but
+            # caches expiring can make it vary.
+            'queries': max(query_counts),
+            'bytes': response.content_length,
+        }
+
+    def write_table(self, results):
+        width = max([len(route) for route in results] + [5])
+        self.stdout.write(f'{"route":<{width}} {"status":>6} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} '
+                          f'{"queries":>7} {"bytes":>9}')
+        for route, r in results.items():
+            self.stdout.write(f'{route:<{width}} {r["status"]:>6} {r["p50_ms"]:>8.2f} {r["p95_ms"]:>8.2f} '
+                              f'{r["p99_ms"]:>8.2f} {r["queries"]:>7} {r["bytes"]:>9,}')
+
+
+def compare(baseline, current, *, threshold, min_ms):
+    # Returns a description of each regression. Query counts and response
+    # sizes are deterministic, so any increase counts; timings are noisy, so
+    # they have to be worse by `threshold` and by at least `min_ms`.
+    regressions = []
+    if (baseline.get('products'), baseline.get('no_cache')) != (current['products'], current['no_cache']):
+        regressions.append('Baseline was made with different --products/--no-cache, so timings are not comparable')
+    for route, now in current['routes'].items():
+        before = baseline['routes'].get(route)
+        if before is None:
+            continue
+        if now['status'] != before['status']:
+            regressions.append(f'{route}: status {before["status"]} -> {now["status"]}')
+        if now['queries'] > before['queries']:
+            regressions.append(f'{route}: queries {before["queries"]} -> {now["queries"]}')
+        if now['bytes'] > before['bytes']:
+            regressions.append(f'{route}: bytes {before["bytes"]:,} -> {now["bytes"]:,}')
+        for key in ['p50_ms', 'p95_ms']:
+            if now[key] > before[key] * (1 + threshold) and now[key] - before[key] >= min_ms:
+                regressions.append(f'{route}: {key} {before[key]:.2f} -> {now[key]:.2f}')
+    return regressions
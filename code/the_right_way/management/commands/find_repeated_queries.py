@@ -0,0 +1,38 @@
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from the_right_way.benchmarking import benchmark_database, seed_site
+from the_right_way.nplusone import describe, repeated_queries_for_all_routes
+
+
+class Command(BaseCommand):
+    help = ("Requests every route on a throwaway seeded database, and reports queries that are "
+            "repeated with different parameters (N+1 queries). Fails if any are found.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=500)
+        parser.add_argument('--threshold', type=int, default=settings.NPLUSONE_THRESHOLD)
+        parser.add_argument('--include-admin', action='store_true')
+
+    def handle(self, *args, products, threshold, include_admin, **options):
+        # Caches are cleared before every request, so use our own.
+        local_caches = {alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+                        for alias in settings.CACHES}
+        overrides = {'CACHES': local_caches, 'ALLOWED_HOSTS': ['testserver'], 'NPLUSONE_ACTION': None}
+        with benchmark_database(), override_settings(**overrides):
+            user = seed_site(products)
+            client = Client()
+            client.force_login(user)
+            # 404s are expected while we look for sample URLs that work.
+            logging.getLogger('django.request').setLevel(logging.ERROR)
+            problems = repeated_queries_for_all_routes(
+                client, threshold=threshold, exclude=() if include_admin else ('admin/',))
+
+        for route, (path, repeated) in problems.items():
+            self.stdout.write(describe(repeated, f'{route} ({path})'))
+        if problems:
+            raise CommandError(f'{len(problems)} route(s) repeat queries')
+        self.stdout.write(self.style.SUCCESS('No repeated queries found'))
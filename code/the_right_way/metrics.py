@@ -0,0 +1,286 @@
+# Per-view request metrics, kept in memory: wall time, SQL time and query
+# count, template rendering time and response size, for each view name (e.g.
+# 'delegation:product_list').
+#
+# Turned on by setting METRICS_SAMPLE_RATE, the fraction of requests to
+# measure. MetricsMiddleware goes first in MIDDLEWARE. Requests that
+# aren't sampled cost one call to random(), and sampled ones a few
+# perf_counter() calls per query, so it's cheap enough to leave on.
+#
+# Values go into histograms with buckets that are a fixed fraction of their
+# value wide (like HdrHistogram), so percentiles are accurate to a few percent
+# at any scale, in a fixed amount of memory. Staff can see them at /metrics/,
+# and /metrics/prometheus/ has them in Prometheus text format. Each process
+# has its own numbers.
+
+import asyncio
+import hmac
+import random
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.db import connections
+from django.http import HttpResponse
+from django.template.response import TemplateResponse
+
+UNRESOLVED = '<unresolved>'
+
+
+class Histogram:
+    # Values are non-negative integers. Values below 2 * SUB_BUCKETS get a
+    # bucket each; above that, each power of two is split into SUB_BUCKETS
+    # buckets, so a bucket is at most 1/SUB_BUCKETS (~3%) of its value wide.
+    SUB_BUCKET_BITS = 5
+    SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    @classmethod
+    def bucket_index(cls, value):
+        if value < 2 * cls.SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - cls.SUB_BUCKET_BITS - 1
+        return shift * cls.SUB_BUCKETS + (value >> shift)
+
+    @classmethod
+    def bucket_range(cls, index):
+        # The (lowest, highest) values that go in a bucket
+        if index < 2 * cls.SUB_BUCKETS:
+            return index, index
+        shift = index // cls.SUB_BUCKETS - 1
+        top = index - shift * cls.SUB_BUCKETS
+        return top << shift, ((top + 1) << shift) - 1
+
+    def record(self, value):
+        value = max(int(value), 0)
+        index = self.bucket_index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        if not self.count:
+            return None
+        rank = max(1, round(self.count * percent / 100))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                low, high = self.bucket_range(index)
+                # The middle of the bucket, but never outside what we've seen
+                return min(max((low + high) / 2, self.min), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+
+# What we measure: the unit values are recorded in, and the Prometheus metric
+# name and the multiplier to get to its (base) unit.
+MEASUREMENTS = {
+    'wall_time': ('µs', 'view_wall_seconds', 1e-6),
+    'sql_time': ('µs', 'view_sql_seconds', 1e-6),
+    'sql_queries': ('', 'view_sql_queries', 1),
+    'template_time': ('µs', 'view_template_render_seconds', 1e-6),
+    'response_size': ('bytes', 'view_response_bytes', 1),
+}
+
+PERCENTILES = [50, 90, 99, 99.9]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def record(self, view_name, values):
+        with self.lock:
+            histograms = self.views.get(view_name)
+            if histograms is None:
+                histograms = self.views[view_name] = {name: Histogram() for name in MEASUREMENTS}
+            for name, value in values.items():
+                if value is not None:
+                    histograms[name].record(value)
+
+    def snapshot(self):
+        # {view name: {measurement: {'count', 'mean', 'min', 'max', 'p50', ...}}}
+        with self.lock:
+            return {
+                view_name: {name: _summarise(histogram) for name, histogram in histograms.items()}
+                for view_name, histograms in sorted(self.views.items())
+            }
+
+    def clear(self):
+        with self.lock:
+            self.views = {}
+
+
+def _summarise(histogram):
+    summary = {'count': histogram.count, 'mean': histogram.mean(), 'min': histogram.min, 'max': histogram.max,
+               'sum': histogram.total}
+    for percent in PERCENTILES:
+        summary[f'p{percent:g}'] = histogram.percentile(percent)
+    return summary
+
+
+registry = MetricsRegistry()
+
+
+class SQLTimer:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+
+
+@contextmanager
+def _timing_queries(timer):
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timer))
+        yield
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_SAMPLE_RATE', 0):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return self.get_response(request)
+
+        sql = SQLTimer()
+        start = time.perf_counter()
+        with _timing_queries(sql):
+            response = self.get_response(request)
+        self.record(request, response, sql, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return await self.get_response(request)
+
+        sql = SQLTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            # Each thread has its own connections, so time the ones in the
+            # thread that the view's sync_to_async() calls run in.
+            await sync_to_async(stack.enter_context)(_timing_queries(sql))
+            response = await self.get_response(request)
+        self.record(request, response, sql, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, sql, wall):
+        match = request.resolver_match
+        registry.record(match.view_name if match is not None else UNRESOLVED, {
+            'wall_time': wall * 1e6,
+            'sql_time': sql.seconds * 1e6,
+            'sql_queries': sql.count,
+            'template_time': getattr(request, '_metrics_template_time', None),
+            # Streaming responses are measured until they start streaming,
+            # and their size isn't known.
+            'response_size': None if response.streaming else len(response.content),
+        })
+
+    def process_template_response(self, request, response):
+        # As the first middleware, we're called last, just before the
+        # response is rendered.
+        start = time.perf_counter()
+
+        def rendered(response):
+            request._metrics_template_time = (time.perf_counter() - start) * 1e6
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+# Views
+
+def _check_staff(request):
+    if not (request.user.is_active and request.user.is_staff):
+        raise PermissionDenied()
+
+
+def metrics_page(request):
+    _check_staff(request)
+    rows = []
+    for view_name, measurements in registry.snapshot().items():
+        for name, summary in measurements.items():
+            if summary['count']:
+                rows.append({
+                    'view': view_name,
+                    'measurement': name.replace('_', ' '),
+                    'unit': MEASUREMENTS[name][0],
+                    'summary': summary,
+                    'percentiles': [summary[f'p{percent:g}'] for percent in PERCENTILES],
+                })
+    return TemplateResponse(request, 'metrics.html', {
+        'rows': rows,
+        'percentiles': [f'p{percent:g}' for percent in PERCENTILES],
+        'sample_rate': getattr(settings, 'METRICS_SAMPLE_RATE', 0),
+    })
+
+
+def prometheus_metrics(request):
+    # For scrapers, which can send METRICS_TOKEN as a bearer token instead of
+    # logging in. (compare_digest only takes ASCII strings, so compare bytes.)
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    authorization = request.headers.get('Authorization', '').encode()
+    if not (token and hmac.compare_digest(authorization, f'Bearer {token}'.encode())):
+        _check_staff(request)
+    return HttpResponse(prometheus_text(registry.snapshot()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def prometheus_text(snapshot):
+    lines = [
+        '# HELP view_metrics_sample_rate Fraction of requests measured',
+        '# TYPE view_metrics_sample_rate gauge',
+        f'view_metrics_sample_rate {getattr(settings, "METRICS_SAMPLE_RATE", 0)}',
+    ]
+    for name, (unit, metric, scale) in MEASUREMENTS.items():
+        lines.append(f'# HELP {metric} {name.replace("_", " ").capitalize()} per view, for sampled requests')
+        lines.append(f'# TYPE {metric} summary')
+        for view_name, measurements in snapshot.items():
+            summary = measurements[name]
+            if not summary['count']:
+                continue
+            view = _label_value(view_name)
+            for percent in PERCENTILES:
+                value = summary[f'p{percent:g}'] * scale
+                lines.append(f'{metric}{{view="{view}",quantile="{percent / 100:g}"}} {value:g}')
+            lines.append(f'{metric}_sum{{view="{view}"}} {summary["sum"] * scale:g}')
+            lines.append(f'{metric}_count{{view="{view}"}} {summary["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def _label_value(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,225 @@
+# Finding "N+1" queries: the same query run again and again with different
+# parameters, usually one per row of something being displayed, e.g. a
+# template looping over products and showing `product.colors.all` for each.
+#
+# `detect_repeated_queries()` records the queries made inside it, grouped by
+# their SQL with literal values taken out, along with where they came from:
+# the template line being rendered, if any, and the line of project code that
+# made the query.
+#
+# NPlusOneMiddleware does that for every request, and logs or raises depending
+# on the NPLUSONE_ACTION setting. For tests, `assert_no_repeated_queries()`
+# checks one request, and `repeated_queries_for_all_routes()` checks every
+# route in the urlconf - see the find_repeated_queries command.
+#
+# Working out where a query came from means inspecting the stack for every
+# query, so this is for development and tests only.
+
+import asyncio
+import logging
+import os
+import re
+import sys
+import threading
+from collections import namedtuple
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.urls import get_resolver
+
+from .route_samples import all_sample_paths, first_working_path, get_response
+
+logger = logging.getLogger(__name__)
+
+# A query is reported if it's made at least this many times in one go
+DEFAULT_THRESHOLD = 3
+
+RepeatedQuery = namedtuple('RepeatedQuery', ['sql', 'count', 'templates', 'call_sites'])
+
+
+class RepeatedQueriesFound(AssertionError):
+    pass
+
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'(?<![\w"])-?\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,)*\s*(?:%s|\?)\s*\)', re.I)
+
+
+def normalise_sql(sql):
+    # Literals and placeholders all become '?', and IN lists of any length
+    # look the same.
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return ' '.join(sql.split())
+
+
+_DJANGO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(sys.modules['django'].__file__)))
+_THIS_FILE = os.path.abspath(__file__)
+
+
+def _is_project_frame(filename):
+    if filename.startswith('<'):
+        return False
+    filename = os.path.abspath(filename)
+    return not (filename.startswith(_DJANGO_DIR) or filename == _THIS_FILE or 'site-packages' in filename)
+
+
+def query_origin():
+    # Returns (template, call site) for the query being made now, as
+    # 'name:line' strings, or None if there isn't one.
+    template = call_site = None
+    frame = sys._getframe(2)
+    while frame is not None and (template is None or call_site is None):
+        code = frame.f_code
+        if template is None and code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                template = f'{origin.template_name or origin.name}:{token.lineno}'
+        if call_site is None and _is_project_frame(code.co_filename):
+            call_site = f'{os.path.relpath(code.co_filename, settings.BASE_DIR)}:{frame.f_lineno}'
+        frame = frame.f_back
+    return template, call_site
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.queries = []
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        template, call_site = query_origin()
+        with self.lock:
+            self.queries.append((sql, template, call_site))
+        return execute(sql, params, many, context)
+
+    def repeated(self, threshold=DEFAULT_THRESHOLD):
+        groups = {}
+        for sql, template, call_site in self.queries:
+            groups.setdefault(normalise_sql(sql), []).append((template, call_site))
+        return [
+            RepeatedQuery(
+                sql, len(origins),
+                sorted({template for template, call_site in origins if template}),
+                sorted({call_site for template, call_site in origins if call_site}),
+            )
+            for sql, origins in groups.items()
+            if len(origins) >= threshold
+        ]
+
+
+@contextmanager
+def detect_repeated_queries():
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+
+
+def describe(repeated, view=None):
+    lines = [f'{"Repeated queries" if view is None else view}:']
+    for query in repeated:
+        lines.append(f'  {query.count} x {query.sql}')
+        for template in query.templates:
+            lines.append(f'      template: {template}')
+        for call_site in query.call_sites:
+            lines.append(f'      called from: {call_site}')
+    return '\n'.join(lines)
+
+
+# Middleware
+
+class NPlusOneMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.NPLUSONE_ACTION is None:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        with detect_repeated_queries() as recorder:
+            response = self.get_response(request)
+        self.check(request, recorder)
+        return response
+
+    async def __acall__(self, request):
+        with ExitStack() as stack:
+            # In the thread the view's sync_to_async() calls run in, as each
+            # thread has its own connections.
+            recorder = await sync_to_async(stack.enter_context)(detect_repeated_queries())
+            response = await self.get_response(request)
+        self.check(request, recorder)
+        return response
+
+    def check(self, request, recorder):
+        repeated = recorder.repeated(getattr(settings, 'NPLUSONE_THRESHOLD', DEFAULT_THRESHOLD))
+        if repeated:
+            match = request.resolver_match
+            view = match.view_name if match is not None else request.path
+            message = describe(repeated, f'{view} ({request.path})')
+            action = settings.NPLUSONE_ACTION
+            if action == 'raise':
+                raise RepeatedQueriesFound(message)
+            elif action == 'log':
+                logger.warning(message, extra={'request': request})
+
+
+# Test helpers
+
+def assert_no_repeated_queries(client, path, *, threshold=DEFAULT_THRESHOLD, **extra):
+    # Requests `path` with a test client, raising RepeatedQueriesFound (an
+    # AssertionError) if it repeats any queries. Returns the response.
+    with detect_repeated_queries() as recorder:
+        response = get_response(client, path, **extra)
+    repeated = recorder.repeated(threshold)
+    if repeated:
+        raise RepeatedQueriesFound(describe(repeated, path))
+    return response
+
+
+def repeated_queries_for_all_routes(client, *, urlconf=None, threshold=DEFAULT_THRESHOLD, exclude=('admin/',),
+                                    clear_caches=True):
+    # Requests a sample URL for every route (see route_samples.py) and returns
+    # {route: (path, [RepeatedQuery])} for the ones that repeat queries. The
+    # database should have enough data for loops to loop - at least
+    # `threshold` related objects. By default caches are cleared before each
+    # request, because cached loops only query when the cache is cold.
+    problems = {}
+    for route, paths in all_sample_paths(get_resolver(urlconf)):
+        if route.startswith(tuple(exclude)):
+            continue
+        path = first_working_path(client, paths)
+        if path is None:
+            continue
+        if clear_caches:
+            for cache in caches.all():
+                cache.clear()
+        with detect_repeated_queries() as recorder:
+            get_response(client, path)
+        repeated = recorder.repeated(threshold)
+        if repeated:
+            problems[route] = (path, repeated)
+    return problems
+
+
+def assert_no_repeated_queries_for_all_routes(client, **kwargs):
+    problems = repeated_queries_for_all_routes(client, **kwargs)
+    if problems:
+        raise RepeatedQueriesFound('\n'.join(
+            describe(repeated, f'{route} ({path})') for route, (path, repeated) in problems.items()
+        ))
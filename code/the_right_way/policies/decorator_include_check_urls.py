@@ -5,4 +5,5 @@ from . import decorator_include_check_views as views
 urlpatterns = [
     path('my-premium-page/', views.my_premium_page, name='my_premium_page'),
     path('ordinary-page/', views.non_premium_page, name='non_premium_page'),
+    path('my-special-page/', views.my_special_page, name='my_special_page'),
 ]
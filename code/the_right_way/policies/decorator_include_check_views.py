@@ -1,5 +1,5 @@
 from django.template.response import TemplateResponse
-from .decorators import premium_required, anonymous_allowed
+from .decorators import AUTHENTICATED, GOOD_REPUTATION, PREMIUM, anonymous_allowed, policy, premium_required
 
 
 @premium_required
@@ -10,3 +10,9 @@ def my_premium_page(request):
 @anonymous_allowed
 def non_premium_page(request):
     return TemplateResponse(request, 'ordinary.html', {})
+
+
+# All the preconditions in one wrapper - see `policy()`
+@policy(AUTHENTICATED, PREMIUM, GOOD_REPUTATION)
+def my_special_page(request):
+    return TemplateResponse(request, 'special.html', {})
@@ -1,5 +1,7 @@
 import functools
+from django.conf import settings
 from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
 from django.http import HttpResponseRedirect
 
 
@@ -27,6 +29,70 @@ def anonymous_allowed(view_func):
     return wrapper
 
 
+# Composing preconditions
+#
+# Stacking decorators like `@login_required` and `@premium_required` means a
+# wrapper function (and call) per precondition, each one fetching things from
+# `request.user` again. `policy()` takes the list of preconditions and builds
+# a single wrapper that checks them all, looking at each user attribute once.
+
+AUTHENTICATED = 'authenticated'
+PREMIUM = 'premium'
+GOOD_REPUTATION = 'good_reputation'
+ANONYMOUS_ALLOWED = 'anonymous_allowed'
+
+PRECONDITIONS = [AUTHENTICATED, PREMIUM, GOOD_REPUTATION, ANONYMOUS_ALLOWED]
+
+
+def policy(*preconditions):
+    # An empty policy would mark a view as checked without checking anything,
+    # so views open to everyone must say so with ANONYMOUS_ALLOWED.
+    if not preconditions:
+        raise ValueError("policy() needs at least one precondition - use policy(ANONYMOUS_ALLOWED) for public views")
+    for precondition in preconditions:
+        if precondition not in PRECONDITIONS:
+            raise ValueError(f"Unknown precondition {precondition!r}, expected one of {PRECONDITIONS}")
+    if ANONYMOUS_ALLOWED in preconditions and len(set(preconditions)) > 1:
+        raise ValueError(f"{ANONYMOUS_ALLOWED!r} can't be combined with other preconditions")
+
+    login = AUTHENTICATED in preconditions
+    premium = PREMIUM in preconditions
+    good_reputation = GOOD_REPUTATION in preconditions
+    check_user = login or premium or good_reputation
+
+    def decorator(view_func):
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if check_user:
+                user = request.user
+                if not user.is_authenticated:
+                    if login:
+                        return redirect_to_login(request.get_full_path(), settings.LOGIN_URL)
+                    # Premium accounts and reputations are only for users who
+                    # are logged in.
+                    return _not_premium(request) if premium else _bad_reputation(request)
+                if premium and not user.is_premium:
+                    return _not_premium(request)
+                if good_reputation and not user.good_reputation:
+                    return _bad_reputation(request)
+            return view_func(request, *args, **kwargs)
+
+        setattr(wrapper, _SECURITY_POLICY_APPLIED, True)
+        return wrapper
+
+    return decorator
+
+
+def _not_premium(request):
+    messages.info(request, "You need to be logged in to a premium account to access that page.")
+    return HttpResponseRedirect('/')
+
+
+def _bad_reputation(request):
+    messages.info(request, "You need a good reputation to access that page.")
+    return HttpResponseRedirect('/')
+
+
 def has_security_policy_applied(view_func):
     return getattr(view_func, _SECURITY_POLICY_APPLIED, False)
 
@@ -1,23 +1,22 @@
-from importlib import import_module
+from .registry import policy_registry
 
-from django.conf import settings
-from django.contrib.admindocs.views import extract_views_from_urlpatterns
+# Routes under here must have a policy applied.
+CHECKED_PREFIX = 'policies/'
 
 
-from .decorators import has_security_policy_applied
-
-
-def check_policy_for_all_routes():
+def check_policy_for_all_routes(routes=None):
+    # `routes` is every route in the urlconf, with its view and whether that
+    # has a policy applied. Building that list is slow for big sites, so
+    # registry.py does it once per process, for this check and runtime lookups.
+    if routes is None:
+        routes = policy_registry.routes
     errors = []
-    urlconf = import_module(settings.ROOT_URLCONF)
-    # extract_views_from_urlpatterns is an undocumented internal from the
-    # contrib 'admindocs' module that happens to be useful for demo purposes.
-    for (func, regex, namespace, name) in extract_views_from_urlpatterns(urlconf.urlpatterns):
-        if not regex.startswith('policies/'):
+    for entry in routes:
+        if not entry.route.startswith(CHECKED_PREFIX):
             continue
-        if not has_security_policy_applied(func):
+        if not entry.policy_applied:
             errors.append(
-                (f"{func.__module__}.{func.__name__} needs to have a security policy applied",
-                 regex),
+                (f"{entry.callback.__module__}.{entry.callback.__name__} needs to have a security policy applied",
+                 entry.route),
             )
     return errors
@@ -0,0 +1,115 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import get_resolver
+
+from the_right_way.url_checker import walk_routes
+
+from .decorators import has_security_policy_applied
+
+logger = logging.getLogger(__name__)
+
+RoutePolicy = namedtuple('RoutePolicy', ['route', 'name', 'callback', 'policy_applied'])
+
+
+class PolicyRegistry:
+    # A table of every route in the urlconf and whether it has a security
+    # policy applied. Walking the urlconf and inspecting every view is slow
+    # for big sites, so we do it once per process, and share the result
+    # between AppConfig.ready(), the system check and anything that wants to
+    # look up a route at runtime.
+    def __init__(self, urlconf=None):
+        self.urlconf = urlconf
+        self.lock = threading.Lock()
+        self.timings = None
+        self._routes = None
+
+    def ensure_built(self):
+        if self._routes is None:
+            with self.lock:
+                if self._routes is None:
+                    self._build()
+
+    @property
+    def routes(self):
+        self.ensure_built()
+        return self._routes
+
+    def _build(self):
+        start = time.perf_counter()
+        resolver = get_resolver(self.urlconf)
+        found = list(walk_routes(resolver))
+        walked = time.perf_counter()
+        routes = []
+        by_route = {}
+        by_name = {}
+        prefixes = {}
+        for parents, pattern in found:
+            # Every route in an include has the same parents, so work out the
+            # route prefix and namespace once for each include.
+            if parents not in prefixes:
+                prefixes[parents] = (join_route(parents), ':'.join(p.namespace for p in parents if p.namespace))
+            prefix, namespace = prefixes[parents]
+            route = join_route([pattern], prefix)
+            name = f'{namespace}:{pattern.name}' if namespace and pattern.name else pattern.name
+            entry = RoutePolicy(route, name, pattern.callback, has_security_policy_applied(pattern.callback))
+            routes.append(entry)
+            by_route.setdefault(route, entry)
+            if name:
+                by_name.setdefault(name, entry)
+        end = time.perf_counter()
+        self._by_route = by_route
+        self._by_name = by_name
+        self._routes = routes
+        self.timings = {
+            'routes': len(routes),
+            'walk_ms': (walked - start) * 1000,
+            'inspect_ms': (end - walked) * 1000,
+            'total_ms': (end - start) * 1000,
+        }
+        logger.info('Built policy table for %(routes)d routes in %(total_ms).1fms '
+                    '(walking urlconf %(walk_ms).1fms, inspecting views %(inspect_ms).1fms)', self.timings)
+
+    def clear(self):
+        with self.lock:
+            self._routes = None
+            self.timings = None
+
+    # Lookups
+
+    def for_route(self, route):
+        self.ensure_built()
+        return self._by_route.get(route)
+
+    def for_name(self, name):
+        self.ensure_built()
+        return self._by_name.get(name)
+
+    def for_request(self, request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return None
+        return self.for_route(match.route)
+
+
+def join_route(patterns, route=''):
+    # The same as ResolverMatch.route
+    for pattern in patterns:
+        part = str(pattern.pattern)
+        if route and part.startswith('^'):
+            part = part[1:]
+        route += part
+    return route
+
+
+policy_registry = PolicyRegistry()
+
+
+@receiver(setting_changed)
+def clear_policy_registry(setting, **kwargs):
+    if setting == 'ROOT_URLCONF':
+        policy_registry.clear()
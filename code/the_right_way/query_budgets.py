@@ -0,0 +1,135 @@
+# Query budgets: the most SQL queries a view should need for one request.
+#
+#   @query_budget(3)
+#   def checkout_start(request):
+#
+# or, to leave the view itself alone, in the urlconf:
+#
+#   path('checkout/start/', query_budget(3)(views.checkout_start)),
+#
+# QueryBudgetMiddleware counts the queries made while handling each request
+# (including rendering a TemplateResponse, and other middleware, e.g. loading
+# the session and `request.user`, so it goes first), and logs or raises if a
+# view goes over its budget, depending on the QUERY_BUDGET_ACTION setting. The
+# `the_right_way.TRW02` system check lists routes that don't have a budget.
+#
+# Queries made by streaming responses while streaming, or by async views in
+# other threads, aren't counted - e.g. `sync_to_async()` calls inside
+# `asyncio.gather()`, which asgiref runs in a thread pool.
+
+import asyncio
+import functools
+import logging
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_QUERY_BUDGET = "QUERY_BUDGET"
+
+# Routes under these must have a budget - see check_query_budgets in apps.py
+CHECKED_PREFIXES_SETTING = 'QUERY_BUDGET_CHECKED_PREFIXES'
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(max_queries):
+    def decorator(view_func):
+        if asyncio.iscoroutinefunction(view_func):
+            @functools.wraps(view_func)
+            async def wrapper(request, *args, **kwargs):
+                return await view_func(request, *args, **kwargs)
+        else:
+            @functools.wraps(view_func)
+            def wrapper(request, *args, **kwargs):
+                return view_func(request, *args, **kwargs)
+
+        setattr(wrapper, _QUERY_BUDGET, max_queries)
+        return wrapper
+
+    return decorator
+
+
+def get_query_budget(view_func):
+    return getattr(view_func, _QUERY_BUDGET, None)
+
+
+def routes_without_query_budget(routes):
+    # `routes` is a list of RoutePolicy from policies.registry, which
+    # already has every route and its view.
+    prefixes = tuple(getattr(settings, CHECKED_PREFIXES_SETTING, ()))
+    return [
+        (f"{entry.callback.__module__}.{entry.callback.__name__} has no query budget", entry.route)
+        for entry in routes
+        if entry.route.startswith(prefixes) and get_query_budget(entry.callback) is None
+    ]
+
+
+@contextmanager
+def _counting_queries(counter):
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class QueryBudgetMiddleware:
+    # Sync and async, like Django's MiddlewareMixin, so that async views
+    # don't get run in a thread under ASGI.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.QUERY_BUDGET_ACTION is None:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        counter = QueryCounter()
+        with _counting_queries(counter):
+            response = self.get_response(request)
+        self.check(request, counter.count)
+        return response
+
+    async def __acall__(self, request):
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            # Connections belong to a thread, so this counts the ones used by
+            # the view's (thread sensitive) sync_to_async() calls.
+            await sync_to_async(stack.enter_context)(_counting_queries(counter))
+            response = await self.get_response(request)
+        self.check(request, counter.count)
+        return response
+
+    def check(self, request, count):
+        budget = getattr(request, '_query_budget', None)
+        if budget is not None and count > budget:
+            message = (f"{request.resolver_match.view_name} made {count} queries, "
+                       f"more than its budget of {budget}")
+            action = settings.QUERY_BUDGET_ACTION
+            if action == 'raise':
+                raise QueryBudgetExceeded(message)
+            elif action == 'log':
+                logger.warning(message, extra={'request': request})
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = get_query_budget(view_func)
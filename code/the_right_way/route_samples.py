@@ -0,0 +1,132 @@
+# Example URLs for every route in the urlconf, for tools that want to request
+# all of them (see the analyse_query_plans command).
+#
+# For each URL parameter we have a list of values to try, based first on the
+# parameter name (e.g. `slug` is probably a product or special offer slug),
+# and then on the converter type. Values that need the database are looked up
+# when asked for, so the database should be filled first.
+
+import datetime
+import itertools
+import re
+import uuid
+
+from django.urls import converters
+from django.urls.resolvers import RoutePattern
+
+from shop.models import Product, SpecialOffer
+
+from .fast_resolver import _PARAMETER_RE
+from .url_checker import get_converter_class_output_type, walk_routes
+
+
+def _product_slugs():
+    return list(Product.objects.order_by('pk').values_list('slug', flat=True)[:1])
+
+
+def _special_offer_slugs():
+    return list(SpecialOffer.objects.order_by('pk').values_list('slug', flat=True)[:1])
+
+
+def _product_names():
+    return list(Product.objects.order_by('pk').values_list('name', flat=True)[:1])
+
+
+def _product_pks():
+    return list(Product.objects.order_by('pk').values_list('pk', flat=True)[:1])
+
+
+def _view_source_namespaces():
+    from .views import source_files
+    return sorted(source_files())[:1]
+
+
+NAME_SAMPLES = {
+    'slug': lambda: _product_slugs() + _special_offer_slugs(),
+    'name': _product_names,
+    'pk': _product_pks,
+    'namespace': _view_source_namespaces,
+}
+
+CONVERTER_SAMPLES = {
+    converters.IntConverter: lambda: [1],
+    converters.StringConverter: lambda: ['test'],
+    converters.SlugConverter: lambda: ['test'],
+    converters.PathConverter: lambda: ['test'],
+    converters.UUIDConverter: lambda: [uuid.UUID(int=0)],
+}
+
+
+def sample_values(name, converter):
+    values = []
+    if name in NAME_SAMPLES:
+        values.extend(NAME_SAMPLES[name]())
+    if type(converter) in CONVERTER_SAMPLES:
+        values.extend(CONVERTER_SAMPLES[type(converter)]())
+    else:
+        # Custom converters, using what url_checker knows about them
+        output_type = get_converter_class_output_type(type(converter))
+        if output_type is datetime.date:
+            values.append(datetime.date.today())
+        elif output_type is int:
+            values.append(1)
+        else:
+            values.append('test')
+    return values
+
+
+def sample_paths(parents, pattern, *, limit=10):
+    # Candidate paths for a route, most likely to work first. Yields nothing
+    # for routes that aren't entirely made from RoutePatterns.
+    patterns = [parent.pattern for parent in parents] + [pattern.pattern]
+    if not all(isinstance(p, RoutePattern) for p in patterns):
+        return
+    all_converters = {}
+    for p in patterns:
+        all_converters.update(p.converters)
+    route = ''.join(str(p) for p in patterns)
+
+    names = list(all_converters)
+    choices = []
+    for name in names:
+        converter = all_converters[name]
+        texts = []
+        for value in sample_values(name, converter):
+            try:
+                text = str(converter.to_url(value))
+            except (ValueError, TypeError, AttributeError):
+                continue
+            if re.fullmatch(converter.regex, text) and text not in texts:
+                texts.append(text)
+        if not texts:
+            return
+        choices.append(texts)
+
+    for combination in itertools.islice(itertools.product(*choices), limit):
+        texts = dict(zip(names, combination))
+        yield '/' + _PARAMETER_RE.sub(lambda m: texts[m['parameter']], route)
+
+
+def all_sample_paths(resolver):
+    # Yields (route, [candidate paths]) for every URLPattern.
+    for parents, pattern in walk_routes(resolver):
+        route = ''.join(str(p.pattern) for p in parents + (pattern,))
+        yield route, list(sample_paths(parents, pattern))
+
+
+def get_response(client, path, **extra):
+    # Reads streaming responses too, so that the view has done all its work.
+    response = client.get(path, **extra)
+    if response.streaming:
+        response.content_length = sum(len(chunk) for chunk in response.streaming_content)
+    else:
+        response.content_length = len(response.content)
+    return response
+
+
+def first_working_path(client, paths, **extra):
+    # The first candidate path that doesn't 404, or None.
+    for path in paths:
+        if get_response(client, path, **extra).status_code != 404:
+            return path
+    return None
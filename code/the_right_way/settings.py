@@ -46,6 +46,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'the_right_way.metrics.MetricsMiddleware',
+    'the_right_way.query_budgets.QueryBudgetMiddleware',
+    'the_right_way.nplusone.NPlusOneMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -87,6 +90,26 @@ DATABASES = {
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/stable/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Product search results - see dependency_injection/search_cache.py.
+    # LocMemCache evicts least recently used entries beyond MAX_ENTRIES.
+    'search': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'search',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
+    },
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/stable/topics/i18n/
 
@@ -116,3 +139,66 @@ AUTH_USER_MODEL = 'accounts.User'
 LOGIN_URL = 'admin:index'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Above this many rows, unfiltered product lists use the database's planner
+# statistics instead of `COUNT(*)` - see the_right_way/delegation/pagination.py
+PRODUCT_COUNT_ESTIMATE_ABOVE = None
+
+# Keep the files served by the_right_way.views.view_source in memory (they are
+# re-read if they change on disk)
+VIEW_SOURCE_CACHE_CONTENTS = False
+
+# Resolve URLs using a trie built from the urlconf, instead of trying each
+# pattern in turn - see the_right_way/fast_resolver.py
+TRIE_URL_RESOLVER = False
+
+# Files written while running, e.g. the special offer view log
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+
+# Where special offer views are logged - see
+# the_right_way/dependency_injection/view_log.py
+SPECIAL_OFFER_VIEW_LOG = {
+    'WRITER': 'the_right_way.dependency_injection.view_log.JSONLinesWriter',
+}
+
+# Set to a file path (e.g. os.path.join(BASE_DIR, '.url_checker_cache.json'))
+# to skip re-checking unchanged routes - see the_right_way/url_checker.py
+URL_CHECKER_CACHE = None
+
+# Uncomment to load `request.user` and sessions from the cache rather than
+# the database on every request - see accounts/backends.py. These need a cache
+# that is shared between processes.
+# AUTHENTICATION_BACKENDS = ['accounts.backends.CachedModelBackend']
+# SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Where, and for how many seconds, CachedModelBackend caches users
+USER_CACHE_ALIAS = 'default'
+USER_CACHE_TIMEOUT = 300
+
+# The cache for users' addresses on the checkout pages, or None to not cache
+# them - see accounts/address_cache.py. Also needs a cache that is shared
+# between processes.
+USER_ADDRESS_CACHE = None
+
+# What to do when a view makes more queries than its @query_budget - 'raise',
+# 'log', or None to not count queries at all. See the_right_way/query_budgets.py
+QUERY_BUDGET_ACTION = 'raise' if DEBUG else 'log'
+
+# Routes under these must have a @query_budget (system check the_right_way.TRW02)
+QUERY_BUDGET_CHECKED_PREFIXES = [
+    'common-context-data/',
+    'delegation/',
+    'dependency-injection/',
+]
+
+# What to do when a request makes the same query (with different parameters)
+# NPLUSONE_THRESHOLD or more times - 'raise', 'log', or None to not check. See
+# the_right_way/nplusone.py
+NPLUSONE_ACTION = 'log' if DEBUG else None
+NPLUSONE_THRESHOLD = 3
+
+# Fraction of requests to record metrics for, e.g. 0.1, or 0 for none. See
+# the_right_way/metrics.py. Prometheus can scrape /metrics/prometheus/ with
+# METRICS_TOKEN as a bearer token.
+METRICS_SAMPLE_RATE = 0
+METRICS_TOKEN = None
@@ -0,0 +1,49 @@
+from django import template
+from django.template.defaulttags import URLNode, url
+from django.urls import NoReverseMatch
+from django.utils.html import conditional_escape
+
+from the_right_way.fast_reverse import get_compiled_reverse
+
+register = template.Library()
+
+
+class FastURLNode(URLNode):
+    # Same as URLNode, but using fast_reverse. Within one render (e.g. a for
+    # loop) we look the view name up once.
+    def render(self, context):
+        args = [arg.resolve(context) for arg in self.args]
+        kwargs = {k: v.resolve(context) for k, v in self.kwargs.items()}
+        view_name = self.view_name.resolve(context)
+        try:
+            current_app = context.request.current_app
+        except AttributeError:
+            try:
+                current_app = context.request.resolver_match.namespace
+            except AttributeError:
+                current_app = None
+        url = ''
+        try:
+            key = (self, view_name, current_app)
+            compiled = context.render_context.get(key)
+            if compiled is None:
+                compiled = context.render_context[key] = get_compiled_reverse(view_name, current_app=current_app)
+            url = compiled(args, kwargs)
+        except NoReverseMatch:
+            if self.asvar is None:
+                raise
+
+        if self.asvar:
+            context[self.asvar] = url
+            return ''
+        else:
+            if context.autoescape:
+                url = conditional_escape(url)
+            return url
+
+
+@register.tag
+def fast_url(parser, token):
+    # Exactly like {% url %}, for URLs built in loops.
+    node = url(parser, token)
+    return FastURLNode(node.view_name, node.args, node.kwargs, node.asvar)
@@ -0,0 +1,55 @@
+from django.test import TestCase
+
+from shop.models import Product
+from the_right_way.delegation.pagination import CachedCountPaginator
+
+
+class FixedCounter:
+    def __init__(self, count, is_estimate):
+        self.result = (count, is_estimate)
+
+    def count_and_estimated(self, queryset):
+        return self.result
+
+
+class CachedCountPaginatorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(12):
+            Product.objects.create(name=f'Product {i:02}', slug=f'product-{i}')
+
+    def paginator(self, count, is_estimate):
+        return CachedCountPaginator(Product.objects.order_by('name'), 5, counter=FixedCounter(count, is_estimate))
+
+    def names(self, page):
+        return [product.name for product in page]
+
+    def test_exact_count(self):
+        paginator = self.paginator(12, False)
+        self.assertEqual(paginator.num_pages, 3)
+        self.assertFalse(paginator.count_is_estimate)
+        self.assertEqual(self.names(paginator.get_page(3)), ['Product 10', 'Product 11'])
+        self.assertEqual(paginator.get_page(7).number, 3)
+
+    def test_low_estimate(self):
+        # The pages after the estimated last page are still there
+        paginator = self.paginator(4, True)
+        self.assertEqual(paginator.num_pages, 1)
+        page = paginator.get_page(1)
+        self.assertTrue(page.has_next())
+        self.assertEqual(page.next_page_number(), 2)
+        page = paginator.get_page(3)
+        self.assertEqual(self.names(page), ['Product 10', 'Product 11'])
+        self.assertFalse(page.has_next())
+        self.assertEqual((page.start_index(), page.end_index()), (11, 12))
+
+    def test_high_estimate(self):
+        paginator = self.paginator(100, True)
+        page = paginator.get_page(2)
+        self.assertEqual(len(page), 5)
+        self.assertTrue(page.has_next())
+        self.assertFalse(paginator.get_page(3).has_next())
+        # Past the end, or not a number, goes back to the start
+        self.assertEqual(paginator.get_page(10).number, 1)
+        self.assertEqual(paginator.get_page('junk').number, 1)
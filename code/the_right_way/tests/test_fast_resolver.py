@@ -0,0 +1,100 @@
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase
+from django.urls import get_resolver, include, path, re_path
+from django.urls.exceptions import Resolver404
+
+from the_right_way.fast_resolver import TrieResolver, excludes_slash, segment_regex
+from the_right_way.route_samples import all_sample_paths
+
+
+def view(request, *args, **kwargs):
+    return HttpResponse()
+
+
+def other_view(request, *args, **kwargs):
+    return HttpResponse()
+
+
+included = [
+    path('', view, name='index'),
+    path('<int:pk>/', view, name='detail'),
+    path('<int:pk>/<slug:slug>/', other_view, name='detail_slug'),
+    re_path(r'^archive/(?P<year>[0-9]{4})/$', view, name='archive'),
+]
+
+# Urlconf for the tests below, with the awkward cases: order mattering,
+# regexes, converters that match '/', defaults, namespaces and nested includes.
+urlpatterns = [
+    path('products/new/', other_view, name='new_product'),
+    path('products/<slug:slug>/', view, name='product'),
+    path('products/<int:pk>/', other_view, name='never_reached'),
+    path('files/<path:name>', view, name='file'),
+    path('files/special/', other_view, name='special_file'),
+    path('v<int:version>/items/', view, name='versioned'),
+    path('shop/', include((included, 'shop'), namespace='shop')),
+    path('outlet/', include((included, 'shop'), namespace='outlet'), {'outlet': True}),
+    re_path(r'^legacy/(\d+)/(\d+)/$', view, name='legacy'),
+    path('nested/<int:group>/', include([path('more/', include(included))])),
+]
+
+
+def same(match, expected):
+    return (match.func, match.args, match.kwargs, match.url_name, match.namespaces, match.route) == (
+        expected.func, expected.args, expected.kwargs, expected.url_name, expected.namespaces, expected.route)
+
+
+class TrieResolverTests(TestCase):
+
+    def assertResolvesLikeDjango(self, urlconf, paths):
+        django_resolver = get_resolver(urlconf)
+        trie_resolver = TrieResolver(django_resolver)
+        for path_ in paths:
+            with self.subTest(path=path_):
+                try:
+                    expected = django_resolver.resolve(path_)
+                except Resolver404:
+                    with self.assertRaises(Resolver404):
+                        trie_resolver.resolve(path_)
+                else:
+                    match = trie_resolver.resolve(path_)
+                    self.assertTrue(same(match, expected), f'{match!r} != {expected!r}')
+
+    def test_awkward_urlconf(self):
+        self.assertResolvesLikeDjango(__name__, [
+            '/products/new/', '/products/hat/', '/products/12/', '/products/', '/products/a/b/',
+            '/files/a/b/c.txt', '/files/special/', '/v2/items/', '/vx/items/',
+            '/shop/', '/shop/3/', '/shop/3/hat/', '/shop/archive/2020/', '/shop/archive/20/',
+            '/outlet/', '/outlet/3/hat/', '/legacy/1/2/', '/legacy/1/',
+            '/nested/4/more/', '/nested/4/more/5/', '/nested/x/more/',
+            '/', '/nowhere/',
+        ])
+
+    def test_project_urlconf(self):
+        # Sample paths use real slugs from the database, where there are any
+        paths = []
+        for route, samples in all_sample_paths(get_resolver()):
+            paths.extend(samples)
+        self.assertTrue(paths)
+        self.assertResolvesLikeDjango(None, paths + ['/no-such-page/', '/admin/no-such-page/'])
+
+
+class SegmentTests(SimpleTestCase):
+
+    def test_excludes_slash(self):
+        self.assertTrue(excludes_slash('[0-9]+'))
+        self.assertTrue(excludes_slash('[^/]+'))
+        self.assertTrue(excludes_slash('[-a-zA-Z0-9_]+'))
+        self.assertTrue(excludes_slash(r'\d{4}(?:-\d\d)?'))
+        self.assertFalse(excludes_slash('.+'))
+        self.assertFalse(excludes_slash('[a-z/]+'))
+        self.assertFalse(excludes_slash(r'\w+|/'))
+
+    def test_segment_regex(self):
+        self.assertEqual(segment_regex('products'), ('products', False))
+        regex, dynamic = segment_regex('v<int:version>')
+        self.assertTrue(dynamic)
+        self.assertRegex('v12', f'^{regex}$')
+        self.assertNotRegex('vx', f'^{regex}$')
+        # Could end anywhere, so can't go in the trie
+        self.assertIsNone(segment_regex('<path:name>'))
+        self.assertIsNone(segment_regex('<unknown:name>'))
@@ -0,0 +1,103 @@
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+from django.urls import NoReverseMatch, clear_script_prefix, include, path, re_path, reverse, set_script_prefix
+
+from the_right_way.fast_reverse import fast_reverse
+
+
+def view(request, *args, **kwargs):
+    return HttpResponse()
+
+
+included = [
+    path('', view, name='index'),
+    path('<int:pk>/', view, name='detail'),
+]
+
+# Urlconf for the tests below: one name with several patterns, defaults,
+# regexes, an app with two instances, and converters in an include.
+urlpatterns = [
+    path('products/<int:pk>/', view, name='product'),
+    path('products/<slug:slug>/', view, name='product'),
+    path('products/<int:pk>/<slug:slug>/', view, name='product'),
+    path('sale/', view, {'on_sale': True}, name='sale'),
+    path('files/<path:name>', view, name='file'),
+    path('search/<str:term>/', view, name='search'),
+    re_path(r'^legacy/(\d+)/$', view, name='legacy'),
+    path('shop/', include((included, 'shop'), namespace='shop')),
+    path('outlet/', include((included, 'shop'), namespace='outlet')),
+    path('<lang>/help/', include(([path('<slug:topic>/', view, name='topic')], 'help'))),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class FastReverseTests(SimpleTestCase):
+
+    def assertReversesLikeDjango(self, viewname, args=None, kwargs=None, current_app=None):
+        try:
+            expected = reverse(viewname, args=args, kwargs=kwargs, current_app=current_app)
+        except NoReverseMatch:
+            with self.assertRaises(NoReverseMatch):
+                fast_reverse(viewname, args=args, kwargs=kwargs, current_app=current_app)
+        else:
+            # Twice, the second time with the compiled patterns
+            for _ in range(2):
+                self.assertEqual(fast_reverse(viewname, args=args, kwargs=kwargs, current_app=current_app),
+                                 expected)
+
+    def test_same_as_reverse(self):
+        cases = [
+            ('product', [12], None),
+            ('product', None, {'pk': 12}),
+            ('product', None, {'slug': 'wool-hat'}),
+            ('product', ['hat'], None),
+            ('product', [12, 'wool-hat'], None),
+            ('product', None, {'pk': 'x'}),
+            ('product', None, {'colour': 'red'}),
+            ('sale', None, None),
+            ('sale', None, {'on_sale': True}),
+            ('sale', None, {'on_sale': False}),
+            ('file', None, {'name': 'a/b c.txt'}),
+            ('file', None, {'name': '/etc/passwd'}),
+            ('search', None, {'term': 'wool & 100% <cotton>?'}),
+            ('search', None, {'term': 'a/b'}),
+            ('legacy', [7], None),
+            ('shop:index', None, None),
+            ('shop:detail', [3], None),
+            ('outlet:detail', [3], None),
+            ('help:topic', None, {'lang': 'en', 'topic': 'returns'}),
+            ('help:topic', ['en', 'returns'], None),
+            ('nothing', None, None),
+        ]
+        for viewname, args, kwargs in cases:
+            with self.subTest(viewname=viewname, args=args, kwargs=kwargs):
+                self.assertReversesLikeDjango(viewname, args, kwargs)
+
+    def test_current_app(self):
+        for current_app in [None, 'shop', 'outlet']:
+            with self.subTest(current_app=current_app):
+                self.assertReversesLikeDjango('shop:detail', [3], current_app=current_app)
+
+    def test_unknown_namespace(self):
+        with self.assertRaises(NoReverseMatch):
+            fast_reverse('nowhere:index')
+
+    def test_script_prefix(self):
+        set_script_prefix('/prefix/')
+        try:
+            self.assertEqual(fast_reverse('product', args=[1]), '/prefix/products/1/')
+        finally:
+            clear_script_prefix()
+        self.assertEqual(fast_reverse('product', args=[1]), '/products/1/')
+
+    def test_template_tag(self):
+        template = Template(
+            '{% load fast_urls %}'
+            '{% for pk in ids %}{% fast_url "product" pk %} {% url "product" pk %}|{% endfor %}'
+            '{% fast_url "search" term="<b>" %} {% url "search" term="<b>" %}|'
+            '{% fast_url "shop:detail" 5 as link %}{{ link }} {% url "shop:detail" 5 %}'
+        )
+        for pair in template.render(Context({'ids': [1, 2, 3]})).split('|'):
+            fast, slow = pair.split(' ')
+            self.assertEqual(fast, slow)
@@ -0,0 +1,69 @@
+from django.test import RequestFactory, TestCase
+
+from shop.models import Product
+from shop.projections import product_list_rows
+from the_right_way.delegation.pagination import decode_cursor, encode_cursor, keyset_paged_object_list_context
+
+
+class CursorTests(TestCase):
+
+    def test_round_trip(self):
+        product = Product(pk=12, name='Hat – “wool”')
+        self.assertEqual(decode_cursor(encode_cursor(product)), ('Hat – “wool”', 12))
+        self.assertEqual(decode_cursor(encode_cursor({'id': 3, 'name': 'Scarf'})), ('Scarf', 3))
+
+    def test_junk_starts_from_the_beginning(self):
+        for token in ['', 'not base64!', 'bm90IGpzb24', encode_cursor({'id': 'x', 'name': 'Hat'})]:
+            self.assertIsNone(decode_cursor(token), token)
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Repeated names, so that pages have to break ties on id
+        names = ['Hat', 'Scarf', 'Hat', 'Boots', 'Hat', 'Coat', 'Scarf']
+        for i, name in enumerate(names):
+            Product.objects.create(name=name, slug=f'product-{i}')
+        cls.expected = list(Product.objects.order_by('name', 'pk').values_list('pk', flat=True))
+
+    def get_page(self, query_string='', projection=None):
+        request = RequestFactory().get('/', QUERY_STRING=query_string)
+        context = keyset_paged_object_list_context(request, Product.objects.all(), paginate_by=3,
+                                                   projection=projection)
+        return context['page_obj']
+
+    def ids(self, page):
+        return [product.pk for product in page]
+
+    def walk_forwards(self, **kwargs):
+        pages = [self.get_page(**kwargs)]
+        while pages[-1].has_next():
+            pages.append(self.get_page(f'after={pages[-1].next_cursor}', **kwargs))
+        return pages
+
+    def test_forwards(self):
+        pages = self.walk_forwards()
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual([pk for page in pages for pk in self.ids(page)], self.expected)
+        self.assertFalse(pages[0].has_previous())
+        self.assertTrue(pages[-1].has_previous())
+
+    def test_backwards(self):
+        pages = self.walk_forwards()
+        page = pages[-1]
+        for previous in reversed(pages[:-1]):
+            page = self.get_page(f'before={page.previous_cursor}')
+            self.assertEqual(self.ids(page), self.ids(previous))
+            self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+
+    def test_projection(self):
+        pages = self.walk_forwards(projection=product_list_rows)
+        self.assertEqual([pk for page in pages for pk in self.ids(page)], self.expected)
+
+    def test_empty(self):
+        Product.objects.all().delete()
+        page = self.get_page()
+        self.assertEqual(len(page), 0)
+        self.assertFalse(page.has_other_pages())
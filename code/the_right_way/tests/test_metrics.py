@@ -0,0 +1,152 @@
+import random
+
+from asgiref.sync import sync_to_async
+from django.template.response import TemplateResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import path
+
+from accounts.models import User
+from shop.models import Product
+from the_right_way import metrics
+from the_right_way.metrics import Histogram, prometheus_text, registry
+
+
+def product_count(request):
+    return TemplateResponse(request, 'hello_world.html', {'count': Product.objects.count()})
+
+
+async def product_count_async(request):
+    count = await sync_to_async(Product.objects.count)()
+    return TemplateResponse(request, 'hello_world.html', {'count': count})
+
+
+urlpatterns = [
+    path('product-count/', product_count, name='product_count'),
+    path('product-count-async/', product_count_async, name='product_count_async'),
+    path('metrics/', metrics.metrics_page, name='metrics'),
+    path('metrics/prometheus/', metrics.prometheus_metrics, name='metrics_prometheus'),
+]
+
+
+class HistogramTests(SimpleTestCase):
+
+    def test_buckets(self):
+        # Every value goes in a bucket whose range includes it, buckets don't
+        # overlap or leave gaps, and are at most 1/SUB_BUCKETS of their values wide.
+        previous_high = -1
+        for index in range(Histogram.bucket_index(10 ** 7) + 1):
+            low, high = Histogram.bucket_range(index)
+            if low > high:
+                continue  # Indexes that are never used
+            self.assertEqual(low, previous_high + 1)
+            self.assertEqual(Histogram.bucket_index(low), index)
+            self.assertEqual(Histogram.bucket_index(high), index)
+            self.assertLessEqual(high - low + 1, max(1, low / Histogram.SUB_BUCKETS))
+            previous_high = high
+
+    def test_small_values_are_exact(self):
+        histogram = Histogram()
+        for value in range(1, 11):
+            histogram.record(value)
+        self.assertEqual(histogram.percentile(50), 5)
+        self.assertEqual(histogram.percentile(90), 9)
+        self.assertEqual(histogram.percentile(100), 10)
+
+    def test_percentiles_are_accurate(self):
+        rng = random.Random(0)
+        values = sorted(int(rng.lognormvariate(8, 2)) for _ in range(10000))
+        histogram = Histogram()
+        for value in values:
+            histogram.record(value)
+        for percent in [50, 90, 99, 99.9]:
+            exact = values[round(len(values) * percent / 100) - 1]
+            self.assertAlmostEqual(histogram.percentile(percent), exact, delta=exact / Histogram.SUB_BUCKETS,
+                                   msg=f'p{percent}')
+
+    def test_summary(self):
+        histogram = Histogram()
+        self.assertIsNone(histogram.percentile(50))
+        self.assertIsNone(histogram.mean())
+        for value in [3000, 1000.7, -5, 2000]:
+            histogram.record(value)
+        self.assertEqual((histogram.count, histogram.min, histogram.max), (4, 0, 3000))
+        self.assertEqual(histogram.mean(), 1500)
+        # The middle of the bucket, but never outside the values actually seen
+        self.assertAlmostEqual(histogram.percentile(100), 3000, delta=3000 / Histogram.SUB_BUCKETS)
+        self.assertLessEqual(histogram.percentile(100), 3000)
+        self.assertEqual(histogram.percentile(1), 0)
+
+
+@override_settings(ROOT_URLCONF=__name__, METRICS_SAMPLE_RATE=1, METRICS_TOKEN='secret')
+class MetricsMiddlewareTests(TestCase):
+
+    def setUp(self):
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+    def assertRecorded(self, view_name):
+        measurements = registry.snapshot()[view_name]
+        self.assertEqual(measurements['wall_time']['count'], 1)
+        self.assertEqual(measurements['sql_queries']['max'], 1)
+        self.assertEqual(measurements['template_time']['count'], 1)
+        self.assertEqual(measurements['response_size']['count'], 1)
+
+    def test_records_view(self):
+        self.client.get('/product-count/')
+        self.assertRecorded('product_count')
+
+    async def test_records_async_view(self):
+        await self.async_client.get('/product-count-async/')
+        self.assertRecorded('product_count_async')
+
+    @override_settings(METRICS_SAMPLE_RATE=0.5)
+    def test_sampling(self):
+        for _ in range(100):
+            self.client.get('/product-count/')
+        self.assertLess(registry.snapshot()['product_count']['wall_time']['count'], 100)
+
+    def test_staff_only(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        self.assertEqual(self.client.get('/metrics/prometheus/').status_code, 403)
+        self.client.force_login(User.objects.create(username='customer'))
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        self.client.force_login(User.objects.create(username='staff', is_staff=True))
+        self.client.get('/product-count/')
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'product_count')
+        self.assertEqual(self.client.get('/metrics/prometheus/').status_code, 200)
+
+    def test_token(self):
+        response = self.client.get('/metrics/prometheus/', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        for authorization in ['Bearer wrong', 'secret', 'Bearer café']:
+            response = self.client.get('/metrics/prometheus/', HTTP_AUTHORIZATION=authorization)
+            self.assertEqual(response.status_code, 403, authorization)
+        with self.settings(METRICS_TOKEN=None):
+            response = self.client.get('/metrics/prometheus/', HTTP_AUTHORIZATION='Bearer None')
+            self.assertEqual(response.status_code, 403)
+
+
+class PrometheusTextTests(SimpleTestCase):
+
+    def test_format(self):
+        snapshot = {'shop:product "detail"': {name: _summarise([]) for name in metrics.MEASUREMENTS}}
+        snapshot['shop:product "detail"']['wall_time'] = _summarise([1000, 3000])
+        with self.settings(METRICS_SAMPLE_RATE=0.1):
+            lines = prometheus_text(snapshot).splitlines()
+        self.assertIn('view_metrics_sample_rate 0.1', lines)
+        self.assertIn('# TYPE view_wall_seconds summary', lines)
+        self.assertIn('view_wall_seconds{view="shop:product \\"detail\\"",quantile="0.5"} 0.001', lines)
+        self.assertIn('view_wall_seconds_sum{view="shop:product \\"detail\\""} 0.004', lines)
+        self.assertIn('view_wall_seconds_count{view="shop:product \\"detail\\""} 2', lines)
+        # Measurements with nothing recorded only get HELP and TYPE lines
+        self.assertFalse([line for line in lines if line.startswith('view_sql_queries')])
+
+
+def _summarise(values):
+    histogram = Histogram()
+    for value in values:
+        histogram.record(value)
+    return metrics._summarise(histogram)
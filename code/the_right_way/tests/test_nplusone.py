@@ -0,0 +1,117 @@
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import path
+
+from accounts.models import Address, User
+from shop.models import Color, Product, SpecialOffer
+from the_right_way.nplusone import (RepeatedQueriesFound, assert_no_repeated_queries,
+                                    assert_no_repeated_queries_for_all_routes, detect_repeated_queries,
+                                    normalise_sql)
+
+COLORS_TEMPLATE = Template('{% for product in products %}{{ product.name }}: {{ product.colors.all|join:", " }}\n'
+                           '{% endfor %}')
+
+
+def product_colors(request):
+    products = Product.objects.order_by('name')
+    if 'prefetch' in request.GET:
+        products = products.prefetch_related('colors')
+    return HttpResponse(COLORS_TEMPLATE.render(Context({'products': products})))
+
+
+urlpatterns = [
+    path('product-colors/', product_colors),
+]
+
+
+class NormaliseSQLTests(TestCase):
+
+    def test_literals_and_placeholders(self):
+        self.assertEqual(
+            normalise_sql('SELECT * FROM "shop_product" WHERE "shop_product"."id" = 12 AND name = \'it\'\'s\''),
+            'SELECT * FROM "shop_product" WHERE "shop_product"."id" = ? AND name = ?',
+        )
+        self.assertEqual(normalise_sql('SELECT a FROM t WHERE b = %s LIMIT 21'),
+                         'SELECT a FROM t WHERE b = ? LIMIT ?')
+
+    def test_in_lists(self):
+        self.assertEqual(normalise_sql('WHERE id IN (%s, %s, %s)'), normalise_sql('WHERE id IN (%s)'))
+        self.assertEqual(normalise_sql('WHERE id IN (1, 2)'), 'WHERE id IN (...)')
+
+    def test_keeps_names_with_digits(self):
+        self.assertEqual(normalise_sql('SELECT "t1"."col2" FROM "t1"'), 'SELECT "t1"."col2" FROM "t1"')
+
+    def test_whitespace(self):
+        self.assertEqual(normalise_sql('SELECT  a\n  FROM t'), 'SELECT a FROM t')
+
+
+@override_settings(ROOT_URLCONF=__name__, NPLUSONE_ACTION=None)
+class RepeatedQueriesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        red, blue = Color.objects.create(name='red'), Color.objects.create(name='blue')
+        for i in range(4):
+            Product.objects.create(name=f'Hat {i}', slug=f'hat-{i}').colors.set([red, blue])
+
+    def test_loop_over_related_objects(self):
+        with self.assertRaises(RepeatedQueriesFound) as cm:
+            assert_no_repeated_queries(self.client, '/product-colors/')
+        message = str(cm.exception)
+        self.assertIn('4 x SELECT', message)
+        self.assertIn('shop_color', message)
+        self.assertIn('called from: the_right_way/tests/test_nplusone.py', message)
+
+    def test_prefetched(self):
+        response = assert_no_repeated_queries(self.client, '/product-colors/?prefetch=1')
+        self.assertContains(response, 'Hat 3: red, blue')
+
+    def test_threshold(self):
+        assert_no_repeated_queries(self.client, '/product-colors/', threshold=5)
+
+    def test_detect_repeated_queries(self):
+        with detect_repeated_queries() as recorder:
+            for product in Product.objects.all():
+                list(product.colors.all())
+        [repeated] = recorder.repeated()
+        self.assertEqual(repeated.count, 4)
+        self.assertEqual(repeated.templates, [])
+
+    @override_settings(NPLUSONE_ACTION='raise')
+    def test_middleware(self):
+        with self.assertRaises(RepeatedQueriesFound):
+            self.client.get('/product-colors/')
+        self.assertEqual(self.client.get('/product-colors/?prefetch=1').status_code, 200)
+
+
+@override_settings(NPLUSONE_ACTION=None,
+                   SPECIAL_OFFER_VIEW_LOG={'WRITER': 'the_right_way.dependency_injection.view_log.NullWriter'})
+class AllRoutesTests(TestCase):
+    # Every route in the project's own urlconf, with enough of everything for
+    # loops over related objects to show up. Except the async views, which
+    # search in other threads - those have their own connections, which
+    # can't see this test's data (or be recorded).
+    exclude = ('admin/', 'dependency-injection/special-offers-async/', 'dependency-injection/products-async/')
+
+    @classmethod
+    def setUpTestData(cls):
+        colors = [Color.objects.create(name=name) for name in ['red', 'green', 'blue', 'black']]
+        products = []
+        for i in range(8):
+            product = Product.objects.create(name=f'Hat {i}', slug=f'hat-{i}', description='A wool hat')
+            product.colors.set(colors)
+            products.append(product)
+        for i in range(2):
+            offer = SpecialOffer.objects.create(name=f'Offer {i}', slug=f'offer-{i}', description='Cheap hats')
+            offer.products.set(products)
+        cls.user = User.objects.create(username='customer', is_premium=True, good_reputation=True)
+        for i in range(4):
+            Address.objects.create(user=cls.user, first_line=f'{i} High Street', post_code='AB1 2CD',
+                                   short_name=f'Address {i}')
+
+    def test_all_routes(self):
+        # Logged in as a premium user, to get past all the checks - some of
+        # the discussion views assume there is a user.
+        self.client.force_login(self.user)
+        assert_no_repeated_queries_for_all_routes(self.client, exclude=self.exclude)
@@ -0,0 +1,65 @@
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from accounts.models import User
+from the_right_way.policies.decorators import (ANONYMOUS_ALLOWED, AUTHENTICATED, GOOD_REPUTATION, PREMIUM,
+                                               has_security_policy_applied, policy)
+
+
+def view(request):
+    return HttpResponse('ok')
+
+
+class PolicyTests(SimpleTestCase):
+
+    def get(self, view_func, user):
+        request = RequestFactory().get('/page/')
+        request.user = user
+        request._messages = CookieStorage(request)
+        return view_func(request)
+
+    def assertAllowed(self, response):
+        self.assertEqual(response.status_code, 200)
+
+    def assertRedirectsTo(self, response, url):
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.url, url)
+
+    def test_marks_view(self):
+        self.assertTrue(has_security_policy_applied(policy(AUTHENTICATED)(view)))
+        self.assertTrue(has_security_policy_applied(policy(ANONYMOUS_ALLOWED)(view)))
+        self.assertFalse(has_security_policy_applied(view))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            policy()
+        with self.assertRaises(ValueError):
+            policy('admin')
+        with self.assertRaises(ValueError):
+            policy(ANONYMOUS_ALLOWED, AUTHENTICATED)
+
+    def test_anonymous_allowed(self):
+        self.assertAllowed(self.get(policy(ANONYMOUS_ALLOWED)(view), AnonymousUser()))
+
+    def test_authenticated(self):
+        wrapped = policy(AUTHENTICATED)(view)
+        response = self.get(wrapped, AnonymousUser())
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('next=/page/', response.url)
+        self.assertAllowed(self.get(wrapped, User()))
+
+    def test_premium(self):
+        wrapped = policy(AUTHENTICATED, PREMIUM)(view)
+        self.assertRedirectsTo(self.get(wrapped, User(is_premium=False)), '/')
+        self.assertAllowed(self.get(wrapped, User(is_premium=True)))
+        # Without AUTHENTICATED, anonymous users just aren't premium
+        self.assertRedirectsTo(self.get(policy(PREMIUM)(view), AnonymousUser()), '/')
+
+    def test_good_reputation(self):
+        wrapped = policy(AUTHENTICATED, PREMIUM, GOOD_REPUTATION)(view)
+        self.assertRedirectsTo(self.get(wrapped, User(is_premium=True, good_reputation=False)), '/')
+        self.assertRedirectsTo(self.get(wrapped, User(is_premium=False, good_reputation=True)), '/')
+        self.assertAllowed(self.get(wrapped, User(is_premium=True, good_reputation=True)))
+        self.assertRedirectsTo(self.get(policy(GOOD_REPUTATION)(view), AnonymousUser()), '/')
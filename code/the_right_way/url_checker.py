@@ -10,20 +10,30 @@
 #
 # Limitations
 # - can't check callbacks defined using ``**kwargs`` (e.g. most CBVs)
+# - for RegexPattern, captured values are always `str`, so that is all we check
+#
+# Signatures are analysed once per callback, and converter output types once
+# per converter class, so big urlconfs that share views are cheap to check.
+#
+# Incremental mode: if the URL_CHECKER_CACHE setting is a file path, we
+# remember routes that had nothing to report, and skip them next time if
+# neither the route nor the modules of its view and converters have changed.
+# This saves re-checking everything on every runserver reload.
 
 # TODO
 # - Fine-grained methods for silencing checks.
-# - Should only warn for each unhandled Converter once
-# - Regex patterns perhaps? (only RoutePattern supported at the moment)
 # - Probably lots of bugs...
 
+import json
+import os
+import sys
 import uuid
 from inspect import Parameter, signature
 
 from django.conf import settings
 from django.core import checks
 from django.urls import URLPattern, URLResolver, converters, get_resolver
-from django.urls.resolvers import RoutePattern
+from django.urls.resolvers import RegexPattern, RoutePattern
 
 
 @checks.register(checks.Tags.urls)
@@ -32,45 +42,63 @@ def check_url_signatures(app_configs, **kwargs):
         return []
 
     resolver = get_resolver()
+    cache = CleanRouteCache(getattr(settings, 'URL_CHECKER_CACHE', None))
+    silenced = set(settings.SILENCED_SYSTEM_CHECKS)
     errors = []
-    for route in get_all_routes(resolver):
-        errors.extend(check_url_args_match(route))
+    warned_converters = set()
+    for parents, route in walk_routes(resolver):
+        if not isinstance(route.pattern, (RoutePattern, RegexPattern)):
+            continue
+        key = cache.key(route)
+        if cache.is_clean(key):
+            continue
+        route_errors = check_url_args_match(route)
+        if all(error.id in silenced for error in route_errors):
+            cache.mark_clean(key)
+        for error in route_errors:
+            # Only warn once about each converter
+            if error.id.startswith('urlchecker.W002'):
+                if error.id in warned_converters:
+                    continue
+                warned_converters.add(error.id)
+            errors.append(error)
+    cache.save()
     return errors
 
 
 def get_all_routes(resolver):
+    for parents, pattern in walk_routes(resolver):
+        if isinstance(pattern.pattern, RoutePattern):
+            yield pattern
+
+
+def walk_routes(resolver, parents=()):
+    # Yields every URLPattern in order, along with the chain of URLResolvers
+    # (outermost first, not including `resolver`) that it is included through.
     for pattern in resolver.url_patterns:
         if isinstance(pattern, URLResolver):
-            yield from get_all_routes(pattern)
+            yield from walk_routes(pattern, parents + (pattern,))
         else:
-            if isinstance(pattern.pattern, RoutePattern):
-                yield pattern
+            yield parents, pattern
 
 
 def check_url_args_match(url_pattern: URLPattern):
     callback = url_pattern.callback
-    callback_repr = f'{callback.__module__}.{callback.__qualname__}'
+    info = analyse_callback(callback)
+    callback_repr = info.callback_repr
     errors = []
-    sig = signature(callback)
-    parameters = sig.parameters
+    parameters = info.parameters
+    has_star_args = info.has_star_args
 
-    has_star_args = False
-    if any(p.kind in [Parameter.VAR_KEYWORD, Parameter.VAR_POSITIONAL]
-           for p in parameters.values()):
+    if has_star_args:
         errors.append(checks.Warning(
             f'View {callback_repr} signature contains *args or **kwarg syntax, can\'t properly check args',
             obj=url_pattern,
             id='urlchecker.W001',
         ))
-        has_star_args = True
 
-    used_from_sig = []
-    parameter_list = list(sig.parameters)
-    if parameter_list and parameter_list[0] == 'self':
-        # HACK: we need to find some nice way to detect closures/bound methods,
-        # while also getting the final signature.
-        parameter_list.pop(0)
-        used_from_sig.append('self')
+    used_from_sig = list(info.used_from_sig)
+    parameter_list = info.parameter_list
 
     if not parameter_list or parameter_list[0] != 'request':
         if not has_star_args:
@@ -89,16 +117,17 @@ def check_url_args_match(url_pattern: URLPattern):
     else:
         used_from_sig.append('request')
 
+    named, positional_count = get_url_parameters(url_pattern.pattern)
+
     # Everything in RoutePattern must be in signature
-    for name, converter in url_pattern.pattern.converters.items():
+    for name, converter in named.items():
         if has_star_args:
             used_from_sig.append(name)
-        elif name in sig.parameters:
+        elif name in parameters:
             used_from_sig.append(name)
-            expected_type = get_converter_output_type(converter)
-            found_type = sig.parameters[name].annotation
+            expected_type = str if converter is None else get_converter_output_type(converter)
+            found_type = parameters[name].annotation
             if expected_type == Parameter.empty:
-                # TODO - only output this warning once per converter
                 errors.append(checks.Warning(
                     f'Don\'t know output type for convert {converter}, can\'t verify URL signatures.',
                     obj=converter,
@@ -124,8 +153,23 @@ def check_url_args_match(url_pattern: URLPattern):
                 id='urlchecker.E003',
             ))
 
+    # Unnamed groups in a RegexPattern are passed positionally, after `request`
+    if positional_count and not has_star_args:
+        positional = [
+            name for name in parameter_list[1:]
+            if parameters[name].kind in (Parameter.POSITIONAL_ONLY, Parameter.POSITIONAL_OR_KEYWORD)
+        ]
+        if len(positional) < positional_count:
+            errors.append(checks.Error(
+                f'View {callback_repr} signature does not have enough parameters for the '
+                f'{positional_count} unnamed groups in urlconf',
+                obj=url_pattern,
+                id='urlchecker.E005',
+            ))
+        used_from_sig.extend(positional[:positional_count])
+
     # Anything left over must have a default argument
-    for name, param in sig.parameters.items():
+    for name, param in parameters.items():
         if name in used_from_sig:
             continue
         if param.kind in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD):
@@ -140,6 +184,49 @@ def check_url_args_match(url_pattern: URLPattern):
     return errors
 
 
+def get_url_parameters(pattern):
+    # Returns ({name: converter}, number of unnamed parameters) for the values
+    # the pattern passes to the view. Regex groups have no converter.
+    if isinstance(pattern, RegexPattern):
+        named = pattern.regex.groupindex
+        if named:
+            # Django ignores unnamed groups if there are any named ones.
+            return {name: None for name in named}, 0
+        return {}, pattern.regex.groups
+    return pattern.converters, 0
+
+
+class CallbackInfo:
+    __slots__ = ['callback_repr', 'parameters', 'parameter_list', 'has_star_args', 'used_from_sig']
+
+    def __init__(self, callback):
+        self.callback_repr = f'{callback.__module__}.{callback.__qualname__}'
+        sig = signature(callback)
+        self.parameters = sig.parameters
+        self.has_star_args = any(p.kind in [Parameter.VAR_KEYWORD, Parameter.VAR_POSITIONAL]
+                                 for p in self.parameters.values())
+        self.used_from_sig = []
+        self.parameter_list = list(self.parameters)
+        if self.parameter_list and self.parameter_list[0] == 'self':
+            # HACK: we need to find some nice way to detect closures/bound methods,
+            # while also getting the final signature.
+            self.parameter_list.pop(0)
+            self.used_from_sig.append('self')
+
+
+_callback_info = {}
+
+
+def analyse_callback(callback):
+    try:
+        return _callback_info[callback]
+    except KeyError:
+        info = _callback_info[callback] = CallbackInfo(callback)
+        return info
+    except TypeError:  # unhashable
+        return CallbackInfo(callback)
+
+
 CONVERTER_TYPES = {
     converters.IntConverter: int,
     converters.StringConverter: str,
@@ -150,12 +237,124 @@ CONVERTER_TYPES = {
 
 
 def get_converter_output_type(converter):
-    cls = type(converter)
+    return get_converter_class_output_type(type(converter))
+
+
+_converter_types = {}
+
+
+def get_converter_class_output_type(cls):
     if cls in CONVERTER_TYPES:
         return CONVERTER_TYPES[cls]
+    if cls not in _converter_types:
+        return_annotation = signature(cls.to_python).return_annotation
+        _converter_types[cls] = return_annotation
+    return _converter_types[cls]
+
+
+# Incremental mode
+
+class CleanRouteCache:
+    def __init__(self, path):
+        self.path = path
+        self.previous = set()
+        self.clean = set()
+        self._module_stamps = {}
+        self._callback_keys = {}
+        self._converter_keys = {}
+        if path is None:
+            return
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get('header') == self.header():
+            self.previous = set(data.get('clean', []))
+
+    def header(self):
+        # If any of this changes, nothing cached is any use.
+        return [self.module_stamp(__name__), list(settings.SILENCED_SYSTEM_CHECKS)]
+
+    def key(self, route):
+        # Changes if the route or anything its checks depend on changes.
+        # Returns None if we can't tell. This is done for every route, so
+        # needs to be a lot cheaper than checking the route.
+        if self.path is None:
+            return None
+        callback_key = self.callback_key(route.callback)
+        if callback_key is None:
+            return None
+        parts = [callback_key, type(route.pattern).__name__, str(route.pattern)]
+        for name, converter in route.pattern.converters.items():
+            converter_key = self.converter_key(type(converter))
+            if converter_key is None:
+                return None
+            parts.append(f'{name}={converter_key}')
+        return '|'.join(parts)
+
+    def callback_key(self, callback):
+        try:
+            return self._callback_keys[callback]
+        except KeyError:
+            pass
+        except TypeError:  # unhashable
+            return None
+        stamps = [self.module_stamp(func.__module__) for func in _unwrap_chain(callback)]
+        if None in stamps:
+            key = None
+        else:
+            key = ' '.join(stamps) + ' ' + getattr(callback, '__qualname__', repr(callback))
+        self._callback_keys[callback] = key
+        return key
+
+    def converter_key(self, cls):
+        if cls not in self._converter_keys:
+            stamp = self.module_stamp(cls.__module__)
+            self._converter_keys[cls] = None if stamp is None else f'{stamp} {cls.__qualname__}'
+        return self._converter_keys[cls]
+
+    def module_stamp(self, module_name):
+        if module_name not in self._module_stamps:
+            stamp = None
+            filename = getattr(sys.modules.get(module_name), '__file__', None)
+            if filename:
+                try:
+                    stat = os.stat(filename)
+                except OSError:
+                    pass
+                else:
+                    stamp = f'{module_name}:{stat.st_mtime_ns}:{stat.st_size}'
+            self._module_stamps[module_name] = stamp
+        return self._module_stamps[module_name]
+
+    def is_clean(self, key):
+        if key is not None and key in self.previous:
+            self.clean.add(key)
+            return True
+        return False
+
+    def mark_clean(self, key):
+        if key is not None:
+            self.clean.add(key)
+
+    def save(self):
+        if self.path is None or self.clean == self.previous:
+            return
+        data = {'header': self.header(), 'clean': sorted(self.clean)}
+        tmp_path = f'{self.path}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass  # Not worth failing checks over.
 
-    sig = signature(converter.to_python)
-    if sig.return_annotation != Parameter.empty:
-        return sig.return_annotation
 
-    return Parameter.empty
+def _unwrap_chain(func):
+    # The callback, and everything it wraps (e.g. decorated views)
+    chain = [func]
+    while hasattr(func, '__wrapped__'):
+        func = func.__wrapped__
+        chain.append(func)
+    return [f for f in chain if hasattr(f, '__module__')]
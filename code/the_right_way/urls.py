@@ -3,12 +3,14 @@
 from django.contrib import admin
 from django.urls import include, path
 
-from . import views
+from . import metrics, views
 
 urlpatterns = [
     path('', views.index),
     path('view-source/<str:namespace>/', views.view_source, name='view_source'),
     path('admin/', admin.site.urls),
+    path('metrics/', metrics.metrics_page, name='metrics'),
+    path('metrics/prometheus/', metrics.prometheus_metrics, name='metrics_prometheus'),
     path('the-pattern/', include('the_right_way.the_pattern.urls')),
     path('the-pattern-explanation/', include('the_right_way.the_pattern.explanation_urls')),
     path('context-data/', include('the_right_way.context_data.urls')),
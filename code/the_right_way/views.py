@@ -1,27 +1,79 @@
-from datetime import date
+import functools
+import os
+from datetime import date, datetime, timezone
 
-from django.http import Http404, HttpResponse
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
 from django.template.response import TemplateResponse
-from django.urls import get_resolver, get_urlconf
+from django.urls import get_resolver
+from django.views.decorators.http import condition
 
 
 def index(request):
     return TemplateResponse(request, 'index.html', {'today': date.today()})
 
 
+def source_etag(request, namespace):
+    stat = source_file_stat(namespace)
+    return None if stat is None else f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def source_last_modified(request, namespace):
+    stat = source_file_stat(namespace)
+    return None if stat is None else datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+
+
+@condition(etag_func=source_etag, last_modified_func=source_last_modified)
 def view_source(request, namespace):
-    module = views_module(namespace)
-    if not module:
+    filename = source_files().get(namespace)
+    if filename is None:
         raise Http404()
-    return HttpResponse(
-        open(module.__file__).read(),
-        content_type='text/plain',
-    )
+    if getattr(settings, 'VIEW_SOURCE_CACHE_CONTENTS', False):
+        return HttpResponse(cached_source(filename), content_type='text/plain; charset=utf-8')
+    # FileResponse closes the file for us, and can use sendfile where the
+    # server supports it.
+    return FileResponse(open(filename, 'rb'), content_type='text/plain; charset=utf-8')
+
+
+@functools.lru_cache(maxsize=None)
+def source_files():
+    # Maps namespace to views module source file. Built once - see apps.py
+    resolver = get_resolver()
+    files = {}
+    for namespace in resolver.namespace_dict:
+        module = views_module(namespace)
+        if module is not None:
+            files[namespace] = module.__file__
+    return files
+
+
+def source_file_stat(namespace):
+    filename = source_files().get(namespace)
+    if filename is None:
+        return None
+    try:
+        return os.stat(filename)
+    except OSError:
+        return None
+
+
+_source_cache = {}
+
+
+def cached_source(filename):
+    # Contents are re-read if the file has changed since we cached them.
+    stat = os.stat(filename)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _source_cache.get(filename)
+    if cached is None or cached[0] != version:
+        with open(filename, 'rb') as f:
+            cached = (version, f.read())
+        _source_cache[filename] = cached
+    return cached[1]
 
 
 def views_module(namespace):
-    urlconf = get_urlconf()
-    resolver = get_resolver(urlconf)
+    resolver = get_resolver()
     _, sub_resolver = resolver.namespace_dict[namespace]
     if hasattr(sub_resolver.urlconf_module, 'views'):
         return sub_resolver.urlconf_module.views
@@ -9,7 +9,7 @@ https://docs.djangoproject.com/en/stable/howto/deployment/wsgi/
 
 import os
 
-from django.core.wsgi import get_wsgi_application
+from the_right_way.fast_resolver import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'the_right_way.settings')
 